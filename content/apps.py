@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ContentConfig(AppConfig):
     name = 'content'
+
+    def ready(self):
+        # Import the module to cause registration of the signals
+        from . import signals  # noqa
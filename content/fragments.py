@@ -0,0 +1,114 @@
+import threading
+
+from django.db import transaction
+from django.db.models import Q
+from wagtail.core.fields import StreamField
+from wagtail.core.models import Page, get_page_models
+
+from digi.utils import bump_generation, get_generation
+
+URL_GENERATION_CACHE_KEY = 'content_url_generation'
+PAGE_GENERATION_CACHE_KEY = 'content_fragments_{}'
+LINK_QUERY_CHUNK_SIZE = 500
+
+_pending = threading.local()
+
+
+def bump_url_generation():
+    """
+    Invalidate caches holding URLs of any page, because the URL of some page has changed.
+    """
+    bump_generation(URL_GENERATION_CACHE_KEY)
+
+
+def get_fragment_key_prefix(page, request=None):
+    """
+    Get the cache key prefix for the rendered blocks of a page.
+
+    The prefix consists of the page id, the id of its live revision (a new
+    revision gets new keys) and a generation counter of the page, bumped when
+    the URL of a page it links to changes. Read it once per render and key each
+    block with the prefix and the block id.
+
+    :param page: Rendered page
+    :type page: wagtail.core.models.Page
+    :param request: Current request, if any
+    :type request: django.http.HttpRequest|None
+    :return: Key prefix, or None if the blocks must not be cached (previews and unpublished pages)
+    :rtype: str|None
+    """
+    if getattr(request, 'is_preview', False) or not page.live_revision_id:
+        return None
+    generation = get_generation(PAGE_GENERATION_CACHE_KEY.format(page.pk))
+    return '{}:{}:{}'.format(page.pk, page.live_revision_id, generation)
+
+
+def get_linking_page_ids(page_ids):
+    """
+    Find the pages whose StreamFields have rich text links to the given pages.
+
+    :param page_ids: Ids of the linked pages
+    :type page_ids: list[int]
+    :rtype: set[int]
+    """
+    page_ids = sorted(set(page_ids))
+    linking_ids = set()
+    for model in get_page_models():
+        fields = [field.name for field in model._meta.local_fields if isinstance(field, StreamField)]
+        if not fields:
+            continue
+        for start in range(0, len(page_ids), LINK_QUERY_CHUNK_SIZE):
+            # Rich text is stored as an escaped string in the StreamField JSON: <a id=\"3\" linktype=\"page\">
+            pattern = r'id=\\"({})\\"'.format('|'.join(str(pk) for pk in page_ids[start:start + LINK_QUERY_CHUNK_SIZE]))
+            query = Q()
+            for field in fields:
+                query |= Q(**{'{}__regex'.format(field): pattern})
+            linking_ids.update(model.objects.filter(query).values_list('pk', flat=True))
+    return linking_ids
+
+
+def invalidate_links_to(pages):
+    """
+    Invalidate the cached blocks of the pages linking to the given pages, after their URLs change.
+
+    :param pages: Pages whose URLs changed; include descendants of moved pages
+    :type pages: list[int]|django.db.models.QuerySet
+    """
+    page_ids = list(pages.values_list('pk', flat=True)) if hasattr(pages, 'values_list') else list(pages)
+    for pk in get_linking_page_ids(page_ids):
+        bump_generation(PAGE_GENERATION_CACHE_KEY.format(pk))
+    bump_url_generation()
+
+
+def invalidate_links_to_on_commit(page_ids):
+    """
+    Invalidate the cached blocks linking to the given pages once the current transaction commits.
+
+    The pages given during one transaction are handled together, so deleting a tree
+    of pages, which signals each page separately, searches for the links only once.
+    Pages given in a transaction that is rolled back are handled with the next one.
+
+    :type page_ids: list[int]
+    """
+    pending = getattr(_pending, 'page_ids', None)
+    if pending is None:
+        pending = _pending.page_ids = set()
+    pending.update(page_ids)
+    transaction.on_commit(_invalidate_pending)
+
+
+def _invalidate_pending():
+    # The first callback of a transaction handles all of its pages; the rest find nothing left
+    page_ids = getattr(_pending, 'page_ids', None)
+    if page_ids:
+        _pending.page_ids = set()
+        invalidate_links_to(page_ids)
+
+
+def invalidate_links_to_subtree(page):
+    """
+    Invalidate the cached blocks linking to a page or any of its descendants.
+
+    :type page: wagtail.core.models.Page
+    """
+    invalidate_links_to(Page.objects.descendant_of(page, inclusive=True))
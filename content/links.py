@@ -0,0 +1,39 @@
+from wagtail.core.models import Page
+from wagtail.documents.models import get_document_model
+
+from digihel.mixins import get_page_urls
+
+
+def resolve_link_urls(links, request=None):
+    """
+    Resolve the URLs of many related links at once.
+
+    Uses one query for the linked pages, one for the linked documents and
+    one site root path lookup, instead of loading them for each link.
+    The URLs are stored on the links, so `link.url` does not hit the database.
+
+    :param links: Objects with `LinkFields`
+    :type links: iterable[content.models.LinkFields]
+    :return: The links, as a list
+    :rtype: list[content.models.LinkFields]
+    """
+    links = list(links)
+    page_ids = set(link.link_page_id for link in links if link.link_page_id)
+    document_ids = set(link.link_document_id for link in links if link.link_document_id)
+
+    page_urls = {}
+    if page_ids:
+        page_urls = get_page_urls(Page.objects.filter(pk__in=page_ids).only('id', 'url_path'), request)
+    documents = {}
+    if document_ids:
+        documents = get_document_model().objects.in_bulk(document_ids)
+
+    for link in links:
+        if link.link_page_id:
+            link.resolved_url = page_urls.get(link.link_page_id)
+        elif link.link_document_id:
+            document = documents.get(link.link_document_id)
+            link.resolved_url = document.url if document else None
+        else:
+            link.resolved_url = link.link_external
+    return links
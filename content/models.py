@@ -10,10 +10,11 @@ from wagtail.core.fields import StreamField
 from wagtail.core.models import Orderable, Page
 from wagtail.documents.edit_handlers import DocumentChooserPanel
 from wagtail.images.blocks import ImageChooserBlock
-from wagtail.search import index
 from wagtail_svgmap.blocks import ImageMapBlock
 
 from digihel.mixins import RelativeURLMixin
+from search.fields import body_search_field
+from search.mixins import SearchTextMixin
 
 rich_text_blocks = [
     ('heading', blocks.CharBlock(classname="full title")),
@@ -55,6 +56,9 @@ class LinkFields(models.Model):
 
     @property
     def url(self):
+        if hasattr(self, 'resolved_url'):
+            # Resolved in bulk by content.links.resolve_link_urls()
+            return self.resolved_url
         if self.link_page:
             return self.link_page.url
         elif self.link_document:
@@ -87,18 +91,18 @@ class RelatedLink(LinkFields):
         abstract = True
 
 
-class ContentPage(RelativeURLMixin, Page):
+class ContentPage(SearchTextMixin, RelativeURLMixin, Page):
     body = StreamField(content_blocks)
 
     content_panels = Page.content_panels + [
         StreamFieldPanel('body')
     ]
     search_fields = Page.search_fields + [
-        index.SearchField('body')
+        body_search_field
     ]
 
 
-class LinkedContentPage(RelativeURLMixin, Page):
+class LinkedContentPage(SearchTextMixin, RelativeURLMixin, Page):
     body = StreamField(content_blocks)
     links_header = models.CharField(_('Links header'), max_length=100, default="", null=True, blank=True)
     contact_information_header = models.CharField(_('Contact information header'), max_length=100, default="", null=True, blank=True)
@@ -123,7 +127,7 @@ class LinkedContentPage(RelativeURLMixin, Page):
         StreamFieldPanel('body'),
     ]
     search_fields = Page.search_fields + [
-        index.SearchField('body'),
+        body_search_field,
     ]
 
 
@@ -0,0 +1,35 @@
+import json
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from wagtail.core.blocks import StreamValue
+from wagtail.core.models import Page
+from wagtail.core.signals import page_published, page_unpublished
+
+from .fragments import invalidate_links_to_on_commit, invalidate_links_to_subtree
+from .toc import build_table_of_contents
+
+
+@receiver(page_published, dispatch_uid='content_build_table_of_contents')
+def build_table_of_contents_on_publish(sender, instance, **kwargs):
+    # Warm the table of contents cache so the first page view does not need to parse the HTML
+    body = getattr(instance, 'body', None)
+    if isinstance(body, StreamValue):
+        build_table_of_contents(body)
+
+
+@receiver(page_published, dispatch_uid='content_invalidate_fragments_on_url_change')
+def invalidate_fragments_on_url_change(sender, instance, revision=None, **kwargs):
+    # The revision holds the url_path the page had when the revision was saved,
+    # while the published page has its url_path recomputed from the new slug
+    if revision is None:
+        return
+    old_url_path = json.loads(revision.content_json).get('url_path')
+    if old_url_path != instance.url_path:
+        invalidate_links_to_subtree(instance)
+
+
+@receiver(post_delete, sender=Page, dispatch_uid='content_invalidate_fragments_on_delete')
+@receiver(page_unpublished, dispatch_uid='content_invalidate_fragments_on_unpublish')
+def invalidate_fragments(sender, instance, **kwargs):
+    invalidate_links_to_on_commit([instance.pk])
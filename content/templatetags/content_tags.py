@@ -1,14 +1,13 @@
 import re
-from collections import Sequence
-
-from bs4 import BeautifulSoup
 
 from django import template
 from django.utils.safestring import mark_safe
 
-from wagtail.core.blocks.base import BoundBlock
-from wagtail.core.rich_text import RichText
-from wagtail.core.models import Site
+from wagtail.core.models import Page, Site
+
+from content.fragments import get_fragment_key_prefix
+from content.links import resolve_link_urls
+from content.toc import build_table_of_contents
 
 register = template.Library()
 
@@ -20,18 +19,25 @@ def get_site_root(context):
     return Site.find_for_request(context['request']).root_page
 
 
-def has_menu_children(page):
-    return page.get_children().live().in_menu().exists()
+def get_pages_with_menu_children(parent):
+    """
+    Get the paths of the children of `parent` that have children shown in menus, in one query.
+    """
+    grandchild_paths = Page.objects.live().in_menu().filter(
+        path__startswith=parent.path, depth=parent.depth + 2,
+    ).values_list('path', flat=True)
+    return {path[:-Page.steplen] for path in grandchild_paths}
 
 
 # Retrieves the top menu items - the immediate children of the parent page
-# The has_menu_children method is necessary because the bootstrap menu requires
+# Whether the items have children of their own is necessary because the bootstrap menu requires
 # a dropdown class to be applied to a parent
 @register.inclusion_tag('tags/top_menu.html', takes_context=True)
 def top_menu(context, parent, calling_page=None):
     menuitems = parent.get_children().live().in_menu()
+    paths_with_children = get_pages_with_menu_children(parent)
     for menuitem in menuitems:
-        menuitem.show_dropdown = has_menu_children(menuitem)
+        menuitem.show_dropdown = menuitem.path in paths_with_children
         # We don't directly check if calling_page is None since the template
         # engine can pass an empty string to calling_page
         # if the variable passed as calling_page does not exist.
@@ -63,8 +69,8 @@ def top_menu_children(context, parent):
     }
 
 
-def list_children(page, target_page):
-    if page.specific == target_page:
+def list_children(page, target_page, site):
+    if page.pk == target_page.pk:
         is_me = True
     else:
         is_me = False
@@ -77,7 +83,7 @@ def list_children(page, target_page):
     if is_parent or is_me:
         children = page.get_children().live().public().order_by('path')
         for child in children:
-            children_html += list_children(child, target_page)
+            children_html += list_children(child, target_page, site)
 
     if is_me:
         klass = 'active'
@@ -89,7 +95,7 @@ def list_children(page, target_page):
         klass = ' class="{}"'.format(klass)
 
     html = '<ul><li{klass}><a href="{url}">{title}</a></li>'\
-        .format(url=page.relative_url(page.get_site()),
+        .format(url=page.relative_url(site),
                 title=page.title, klass=klass)
     html += children_html
     html += '</ul>'
@@ -104,11 +110,29 @@ def sidebar_page_nav(page):
     if parent is None:
         return ''
 
-    html = list_children(parent, page)
+    html = list_children(parent, page, page.get_site())
 
     return mark_safe(html)
 
 
+@register.simple_tag(takes_context=True)
+def resolve_links(context, links):
+    """
+    Resolve the URLs of related links in bulk:
+    {% resolve_links page.links.all as links %}
+    """
+    return resolve_link_urls(links, context.get('request'))
+
+
+@register.simple_tag(takes_context=True)
+def fragment_key_prefix(context, page):
+    """
+    Get the cache key prefix for the blocks of a page, to pass to `content/blocks.html`:
+    {% fragment_key_prefix page as fragment_prefix %}
+    """
+    return get_fragment_key_prefix(page, context.get('request'))
+
+
 class TableOfContentsNode(template.Node):
     def __init__(self, html_accessor, toc_var_name):
         self.html_accessor = html_accessor
@@ -116,45 +140,8 @@ class TableOfContentsNode(template.Node):
         self.toc_var_name = toc_var_name
 
     def render(self, context):
-
         blocks = self.html_var.resolve(context)
-
-        if not isinstance(blocks, Sequence):
-            blocks = [blocks]
-
-        headings_and_anchors = []
-        toc_anchor_count = 1
-
-        for block in blocks:
-            if (not isinstance(block, BoundBlock) or not
-            isinstance(block.value, RichText)):
-                continue
-            soup = BeautifulSoup(block.value.source)
-            h2_tags = soup.find_all('h2')
-
-            if not h2_tags:
-                continue
-
-            for t in h2_tags:
-                # let's not add empty headings to table of contents
-                if not t.string.strip():
-                    continue
-                anchor = 'toc-{}'.format(toc_anchor_count)
-                headings_and_anchors.append((t.string, anchor))
-                t.insert_before(soup.new_tag('span', id=anchor, **{'class':'toc-anchor'}))
-                toc_anchor_count += 1
-
-            new_source = str(soup)
-            # See wagtail.core.rich_text expand_db_html and
-            # replace_embed_tag - if the embed tag doesn't close itself,
-            # replace_embed_tag doesn't recognize it, and can't replace it
-            # with img tag
-            new_source = new_source.replace('></embed>', '/>')
-            block.value.source = new_source
-
-
-        context[self.toc_var_name] = headings_and_anchors
-
+        context[self.toc_var_name] = build_table_of_contents(blocks)
         return ''
 
     def __unicode__(self):
@@ -171,7 +158,8 @@ def do_table_of_contents(parser, token):
     RichText value, goes through H2 elements, and adds an anchor to them. It
     puts out a list or headings and anchors, as in
     [('Heading 1', 'toc-1'), ...], which can be used to render a table of
-    contents in the template.
+    contents in the template. The anchored HTML is cached per block revision,
+    see content.toc.
     """
     try:
         # Splitting by None == splitting by spaces.
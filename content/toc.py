@@ -0,0 +1,84 @@
+import hashlib
+from collections import Sequence
+
+from bs4 import BeautifulSoup
+from django.core.cache import cache
+from wagtail.core.blocks.base import BoundBlock
+from wagtail.core.rich_text import RichText
+
+TOC_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def get_anchored_html(source, block_id, first_anchor):
+    """
+    Add anchors before the H2 headings of a rich text HTML source.
+
+    The result is cached by the block id and a hash of the source, so each
+    revision of a block is only parsed once.
+
+    :param source: Rich text HTML source
+    :type source: str
+    :param block_id: Id of the StreamField block, if any
+    :type block_id: str|None
+    :param first_anchor: Number of the first anchor to add
+    :type first_anchor: int
+    :return: List of (heading, anchor) tuples and the anchored HTML source
+    :rtype: tuple[list[tuple[str, str]], str]
+    """
+    digest = hashlib.md5(source.encode('utf8')).hexdigest()
+    cache_key = 'toc_{}_{}_{}'.format(block_id, digest, first_anchor)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    soup = BeautifulSoup(source, 'html.parser')
+    headings_and_anchors = []
+    anchor_count = first_anchor
+    for t in soup.find_all('h2'):
+        heading = t.get_text()
+        # let's not add empty headings to table of contents
+        if not heading.strip():
+            continue
+        anchor = 'toc-{}'.format(anchor_count)
+        headings_and_anchors.append((heading, anchor))
+        t.insert_before(soup.new_tag('span', id=anchor, **{'class': 'toc-anchor'}))
+        anchor_count += 1
+
+    if headings_and_anchors:
+        new_source = str(soup)
+        # See wagtail.core.rich_text expand_db_html and
+        # replace_embed_tag - if the embed tag doesn't close itself,
+        # replace_embed_tag doesn't recognize it, and can't replace it
+        # with img tag
+        new_source = new_source.replace('></embed>', '/>')
+    else:
+        new_source = source
+
+    result = (headings_and_anchors, new_source)
+    cache.set(cache_key, result, TOC_CACHE_TIMEOUT)
+    return result
+
+
+def build_table_of_contents(blocks):
+    """
+    Add anchors to the H2 headings of rich text blocks and list them.
+
+    The sources of the blocks are replaced with the anchored HTML.
+
+    :param blocks: A BoundBlock or a sequence of them, such as a StreamValue
+    :return: List of (heading, anchor) tuples, as in [('Heading 1', 'toc-1'), ...]
+    :rtype: list[tuple[str, str]]
+    """
+    if not isinstance(blocks, Sequence):
+        blocks = [blocks]
+
+    headings_and_anchors = []
+    for block in blocks:
+        if not isinstance(block, BoundBlock) or not isinstance(block.value, RichText):
+            continue
+        block_headings, new_source = get_anchored_html(
+            block.value.source, getattr(block, 'id', None), len(headings_and_anchors) + 1
+        )
+        headings_and_anchors.extend(block_headings)
+        block.value.source = new_source
+    return headings_and_anchors
@@ -0,0 +1,8 @@
+from wagtail.core import hooks
+
+from .fragments import invalidate_links_to_subtree
+
+
+@hooks.register('after_move_page')
+def invalidate_fragments_on_move(request, page_to_move):
+    invalidate_links_to_subtree(page_to_move)
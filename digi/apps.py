@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DigiConfig(AppConfig):
     name = 'digi'
+
+    def ready(self):
+        # Import the module to cause registration of the signals
+        from . import signals  # noqa
@@ -0,0 +1,135 @@
+from html.parser import HTMLParser
+
+from django.utils.text import Truncator
+from wagtail.core.blocks import StreamValue
+from wagtail.core.rich_text import RichText, expand_db_html
+
+EXCERPT_MAX_LENGTH = 280
+
+
+class ExcerptParser(HTMLParser):
+    """
+    Streaming HTML tokenizer that captures the first paragraph of a document.
+
+    Stops consuming input as soon as the first paragraph has been closed.
+    The text content of the whole document seen so far is collected as well,
+    for documents with no paragraphs.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.paragraph = None
+        self.text = []
+        self.done = False
+        self._in_paragraph = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._in_paragraph:
+            if tag == 'p':
+                # An unclosed paragraph is implicitly closed by the next one
+                self._close_paragraph()
+            else:
+                self.paragraph.append(self.get_starttag_text())
+                return
+        if tag == 'p' and not self.done:
+            self._in_paragraph = True
+            self.paragraph = []
+
+    def handle_startendtag(self, tag, attrs):
+        if self._in_paragraph:
+            self.paragraph.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if not self._in_paragraph:
+            return
+        if tag == 'p':
+            self._close_paragraph()
+        else:
+            self.paragraph.append('</{}>'.format(tag))
+
+    def handle_data(self, data):
+        if self._in_paragraph:
+            self.paragraph.append(data)
+        self.text.append(data)
+
+    def handle_entityref(self, name):
+        self.handle_data('&{};'.format(name))
+
+    def handle_charref(self, name):
+        self.handle_data('&#{};'.format(name))
+
+    def _close_paragraph(self):
+        self._in_paragraph = False
+        self.done = True
+
+    def feed_until_done(self, html, chunk_size=4096):
+        for start in range(0, len(html), chunk_size):
+            self.feed(html[start:start + chunk_size])
+            if self.done:
+                return
+        self.close()
+        if self._in_paragraph:
+            self._close_paragraph()
+
+
+def _parse(html):
+    parser = ExcerptParser()
+    parser.feed_until_done(html or '')
+    return parser
+
+
+def get_first_paragraph(html):
+    """
+    Return the first paragraph of the HTML without its attributes, or None if there is none.
+
+    :param html: HTML source
+    :type html: str
+    :rtype: str|None
+    """
+    parser = _parse(html)
+    if parser.paragraph is None:
+        return None
+    return '<p>{}</p>'.format(''.join(parser.paragraph))
+
+
+def extract_excerpt(html, max_length=EXCERPT_MAX_LENGTH):
+    """
+    Extract an excerpt from HTML: the first paragraph, or a length-limited plain text summary.
+
+    :param html: HTML source
+    :type html: str
+    :param max_length: Maximum length of the plain text summary
+    :type max_length: int
+    :return: Excerpt HTML
+    :rtype: str
+    """
+    parser = _parse(html)
+    if parser.paragraph is not None:
+        return '<p>{}</p>'.format(''.join(parser.paragraph))
+    text = ' '.join(''.join(parser.text).split())
+    if not text:
+        return ''
+    return '<p>{}</p>'.format(Truncator(text).chars(max_length))
+
+
+def get_page_body_html(page):
+    """
+    Get the HTML of the body of a page, with rich text internal links and images expanded.
+    """
+    body = getattr(page, 'body', None)
+    if isinstance(body, StreamValue):
+        html = ''.join(block.value.source for block in body if isinstance(block.value, RichText))
+    elif isinstance(body, str):
+        html = body
+    else:
+        return ''
+    return expand_db_html(html)
+
+
+def update_page_excerpt(page):
+    from digi.models import PageExcerpt
+
+    excerpt, created = PageExcerpt.objects.update_or_create(
+        page_id=page.pk, defaults={'text': extract_excerpt(get_page_body_html(page))}
+    )
+    return excerpt
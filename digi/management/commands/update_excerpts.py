@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from wagtail.core.models import Page
+
+from digi.excerpts import update_page_excerpt
+
+
+class Command(BaseCommand):
+    help = 'Extracts and saves the excerpts of all live pages with a body'
+
+    def handle(self, *args, **options):
+        count = 0
+        for page in Page.objects.live().specific().iterator():
+            if hasattr(page, 'body'):
+                update_page_excerpt(page)
+                count += 1
+        self.stdout.write(self.style.SUCCESS('Successfully updated {} page excerpts'.format(count)))
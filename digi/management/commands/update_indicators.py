@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from digi.models import Indicator
 from datetime import date, timedelta
@@ -17,7 +18,8 @@ class Command(BaseCommand):
             #HRI DATASETS
             elif indicator.slug == 'tietoaineistot':
                 try:
-                    resp = requests.get('http://hri.fi/api/3/action/package_list')
+                    resp = requests.get('{}action/package_list'.format(
+                        getattr(settings, 'HRI_API_URL', 'http://hri.fi/api/3/')))
                     indicator.value = len(resp.json()['result'])
                 except Exception as e:
                     raise CommandError('Something went wrong while updating indicator {}. Retaining previous value {}.'.format(indicator.slug, indicator.value))
@@ -26,7 +28,8 @@ class Command(BaseCommand):
             elif indicator.slug == 'palaute':
                 try:
                     week_ago = (date.today() - timedelta(days=7)).isoformat()
-                    resp = requests.get('https://asiointi.hel.fi/palautews/rest/v1/requests.json?status=closed&start_date={}'.format(week_ago))
+                    resp = requests.get('{}requests.json?status=closed&start_date={}'.format(
+                        getattr(settings, 'OPEN311_API_URL', 'https://asiointi.hel.fi/palautews/rest/v1/'), week_ago))
                     # today = date.today().isoformat()
                     # resp = requests.get('https://asiointi.hel.fi/palautews/rest/v1/requests.json?status=closed&start_date={}'.format(today))
                     indicator.value = len(resp.json())
@@ -35,7 +38,8 @@ class Command(BaseCommand):
 
             elif indicator.slug == 'varaukset':
                 try:
-                    resp = requests.get('https://api.hel.fi/respa/v1/reservation?all=true')
+                    resp = requests.get('{}reservation?all=true'.format(
+                        getattr(settings, 'RESPA_API_URL', 'https://api.hel.fi/respa/v1/')))
                     indicator.value = resp.json()['count']
                 except Exception as e:
                     raise CommandError('Something went wrong while updating indicator {}. Retaining previous value {}.'.format(indicator.slug, indicator.value))
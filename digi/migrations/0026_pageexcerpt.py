@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.2.1 on 2026-10-19 11:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0039_collectionviewrestriction'),
+        ('digi', '0025_add_hero_badge_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageExcerpt',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='excerpt', serialize=False, to='wagtailcore.Page')),
+                ('text', models.TextField()),
+            ],
+        ),
+    ]
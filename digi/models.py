@@ -14,9 +14,12 @@ from wagtail.documents.edit_handlers import DocumentChooserPanel
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail.search import index
 
+from content.links import resolve_link_urls
 from content.models import RelatedLink
 from digihel.mixins import RelativeURLMixin
 from events.models import EventsIndexPage
+from search.fields import body_search_field
+from search.mixins import SearchTextMixin
 
 from news.news import get_news_cached
 
@@ -85,6 +88,18 @@ class Phase():
     )
 
 
+class PageExcerpt(models.Model):
+    """
+    Excerpt of the body of a page for listings, extracted when the page is published.
+    """
+    page = models.OneToOneField('wagtailcore.Page', primary_key=True, related_name='excerpt',
+                                on_delete=models.CASCADE)
+    text = models.TextField()
+
+    def __str__(self):
+        return self.text
+
+
 class FooterLinkSection(ClusterableModel):
     title = models.CharField(max_length=100, null=True, blank=True)
     sort_order = models.IntegerField(null=True, blank=True)
@@ -127,10 +142,10 @@ class GuideFrontPage(RelativeURLMixin, Page):
 
     @property
     def blog_posts(self):
-        posts = BlogPage.objects.descendant_of(self).live().order_by('-date')
+        posts = BlogPage.objects.descendant_of(self).live().order_by('-date').select_related('excerpt')
         return posts
 
-class GuideContentPage(RelativeURLMixin, Page):
+class GuideContentPage(SearchTextMixin, RelativeURLMixin, Page):
     body = StreamField(guide_blocks)
     sidebar = StreamField(guide_blocks)
 
@@ -139,10 +154,10 @@ class GuideContentPage(RelativeURLMixin, Page):
         StreamFieldPanel('sidebar')
     ]
     search_fields = Page.search_fields + [
-        index.SearchField('body')
+        body_search_field
     ]
 
-class ThemePage(RelativeURLMixin, Page):
+class ThemePage(SearchTextMixin, RelativeURLMixin, Page):
     image = models.ForeignKey('wagtailimages.Image', null=True, blank=True,
                               on_delete=models.SET_NULL, related_name='+')
     type = models.CharField(max_length=10, default="Teema")
@@ -171,7 +186,7 @@ class ThemePage(RelativeURLMixin, Page):
     ]
     search_fields = Page.search_fields + [
         index.SearchField('short_description'),
-        index.SearchField('body'),
+        body_search_field,
     ]
     subpage_types = ['ProjectPage']
 
@@ -203,7 +218,7 @@ class ThemeRole(Orderable):
 class ThemeLink(Orderable, RelatedLink):
     theme = ParentalKey('digi.ThemePage', related_name='links')
 
-class ProjectPage(RelativeURLMixin, Page):
+class ProjectPage(SearchTextMixin, RelativeURLMixin, Page):
     type = _('Project')
     image = models.ForeignKey('wagtailimages.Image', null=True, blank=True,
                               on_delete=models.SET_NULL, related_name='+')
@@ -226,7 +241,7 @@ class ProjectPage(RelativeURLMixin, Page):
     ]
     search_fields = Page.search_fields + [
         index.SearchField('short_description'),
-        index.SearchField('body'),
+        body_search_field,
     ]
     parent_page_types = ['ThemePage']
 
@@ -333,4 +348,11 @@ class FrontPage(RelativeURLMixin, Page):
 
     @property
     def footer_link_sections(self):
-        return FooterLinkSection.objects.order_by('sort_order')
+        sections = list(FooterLinkSection.objects.order_by('sort_order'))
+        links = FooterLink.objects.filter(section__in=sections).order_by('sort_order')
+        links_by_section = {}
+        for link in resolve_link_urls(links):
+            links_by_section.setdefault(link.section_id, []).append(link)
+        for section in sections:
+            section.resolved_links = links_by_section.get(section.pk, [])
+        return sections
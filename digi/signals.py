@@ -0,0 +1,10 @@
+from django.dispatch import receiver
+from wagtail.core.signals import page_published
+
+from .excerpts import update_page_excerpt
+
+
+@receiver(page_published, dispatch_uid='digi_update_page_excerpt')
+def update_page_excerpt_on_publish(sender, instance, **kwargs):
+    if hasattr(instance, 'body'):
+        update_page_excerpt(instance)
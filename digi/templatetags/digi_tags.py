@@ -1,10 +1,9 @@
-import re
-
 from dateutil import parser
 from django import template
 from django.utils.safestring import mark_safe
 
-from ..models import Phase
+from ..excerpts import extract_excerpt, get_first_paragraph, get_page_body_html
+from ..models import PageExcerpt, Phase
 
 register = template.Library()
 
@@ -12,15 +11,41 @@ register = template.Library()
 @register.filter
 def first_p(value):
     if value:
-        p_search = re.search(r'<p(|\s+[^>]*)>.*<\/p>', value)
-        if p_search:
-            value = p_search.group(0)
-            if len(p_search.group(1)) > 0:
-                value = value.replace(p_search.group(1), '')
-            return value
+        return get_first_paragraph(str(value)) or ''
+    return ''
+
+
+@register.simple_tag
+def attach_excerpts(pages):
+    """
+    Load the stored excerpts of the given pages in one query, for use with the `excerpt` filter.
+    """
+    pages = [page for page in pages if page.pk]
+    excerpts = PageExcerpt.objects.in_bulk([page.pk for page in pages])
+    for page in pages:
+        excerpt = excerpts.get(page.pk)
+        page._excerpt = excerpt.text if excerpt else None
     return ''
 
 
+@register.filter
+def excerpt(page):
+    """
+    Return the excerpt of a page, as stored when the page was published.
+
+    Falls back to extracting it from the body if it has not been stored yet.
+    """
+    text = getattr(page, '_excerpt', None)
+    if text is None and not hasattr(page, '_excerpt'):
+        try:
+            text = page.excerpt.text
+        except PageExcerpt.DoesNotExist:
+            pass
+    if text is None:
+        text = extract_excerpt(get_page_body_html(page))
+    return text
+
+
 @register.filter
 def convert_datetime(value):
     return parser.parse(value)
@@ -7,7 +7,7 @@ register = template.Library()
 
 
 def list_children(page, target_page):
-    if page.specific == target_page:
+    if page.pk == target_page.pk:
         is_me = True
     else:
         is_me = False
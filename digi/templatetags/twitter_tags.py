@@ -4,6 +4,7 @@ from django.conf import settings
 from django.utils.text import slugify
 from digi.tweet_utils import render_tweet_html
 from digi.utils import get_cached_with_mtime
+from digihel.tracing import span
 
 TWEET_CACHE_REFRESH_AGE = 60 * 15  # if tweets are 15 minutes old, attempt reload
 
@@ -23,7 +24,8 @@ def get_tweepy_api():
     except AttributeError:
         print('No Twitter tokens found in settings')
         return None
-    return tweepy.API(auth)
+    # Tweepy always uses HTTPS, so a fake upstream host must serve HTTPS too
+    return tweepy.API(auth, host=getattr(settings, 'TWITTER_API_HOST', 'api.twitter.com'))
 
 
 @register.simple_tag()
@@ -38,11 +40,16 @@ def twitter_search(query):
     tweepy_api = get_tweepy_api()
     if not tweepy_api:
         return None
+
+    def search():
+        with span('twitter.search', 'integration', query=query):
+            return tweepy_api.search(q=query, rpp=100, result_type='recent')
+
     try:
         results = list(get_cached_with_mtime(
             cache_key='twitter_%s' % slugify(query),
             max_mtime=TWEET_CACHE_REFRESH_AGE,
-            getter=lambda: tweepy_api.search(q=query, rpp=100, result_type='recent'),
+            getter=search,
             default=[],
         ))
     except tweepy.TweepError as error:
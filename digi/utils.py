@@ -47,3 +47,35 @@ def get_cached_with_mtime(cache_key, getter, max_mtime=60, default=None, expiry=
                 cached_data = {'mtime': time.time(), 'data': default}
                 cache.set(cache_key, cached_data, max_mtime)
     return cached_data['data']
+
+
+def get_generation(cache_key):
+    """
+    Get the current value of a generation counter stored in the cache.
+
+    Generation counters are used as a part of other cache keys, so that
+    bumping the counter invalidates all of the entries at once.
+
+    :param cache_key: Cache key of the counter
+    :type cache_key: str
+    :return: Current generation
+    :rtype: int
+    """
+    generation = cache.get(cache_key)
+    if generation is None:
+        cache.add(cache_key, 1, None)
+        generation = cache.get(cache_key, 1)
+    return generation
+
+
+def bump_generation(cache_key):
+    """
+    Move a generation counter stored in the cache to the next generation.
+
+    :param cache_key: Cache key of the counter
+    :type cache_key: str
+    """
+    try:
+        cache.incr(cache_key)
+    except ValueError:
+        cache.set(cache_key, 2, None)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class DigihelConfig(AppConfig):
+    name = 'digihel'
+
+    def ready(self):
+        # Import the module to cause registration of the signals
+        from . import signals  # noqa
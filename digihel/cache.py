@@ -0,0 +1,456 @@
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+VERSION_CACHE_KEY = 'tiered_cache_l1_version'
+DEFAULT_L1_KEY_PREFIXES = (
+    'news_cache_key',
+    'linkedevents',
+    'facebook',
+    'twitter_',
+    'person_directory_',
+)
+
+# The in-process tiers, shared by the threads of the process
+# (Django creates a cache backend instance per thread)
+_l1_stores = {}
+_l1_stores_lock = threading.Lock()
+
+
+class L1Store(object):
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_checked_at = 0
+
+
+def get_l1_store(location):
+    with _l1_stores_lock:
+        return _l1_stores.setdefault(location, L1Store())
+
+
+class TieredCache(BaseCache):
+    """
+    A cache backend that keeps hot entries in a small in-process LRU in front of a shared cache.
+
+    `LOCATION` is the alias of the shared cache in `CACHES`. Only keys starting with
+    one of `OPTIONS['L1_KEY_PREFIXES']` are kept in-process; everything else, such as
+    counters and locks, goes straight to the shared cache. Template fragments are not
+    kept in-process by default: they are filled often, and each fill would drop the
+    in-process entries of every process.
+
+    Every write of an in-process key through this backend bumps a version key in the
+    shared cache. Each process checks the version at most every
+    `OPTIONS['VERSION_CHECK_INTERVAL']` seconds and drops its in-process entries
+    when it has changed, so other processes see a write after that interval at the latest.
+
+    Values kept in-process are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 200)
+        self._l1_timeout = options.get('L1_TIMEOUT', 10)
+        self._l1_key_prefixes = tuple(options.get('L1_KEY_PREFIXES', DEFAULT_L1_KEY_PREFIXES))
+        self._version_check_interval = options.get('VERSION_CHECK_INTERVAL', 1)
+        self._store = get_l1_store(location)
+
+    @cached_property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _is_l1_key(self, key):
+        return key.startswith(self._l1_key_prefixes)
+
+    def _check_version(self):
+        store = self._store
+        now = time.time()
+        if now - store.version_checked_at < self._version_check_interval:
+            return
+        store.version_checked_at = now
+        version = self.l2.get(VERSION_CACHE_KEY)
+        if version != store.version:
+            with store.lock:
+                store.entries.clear()
+            store.version = version
+
+    def _bump_version(self):
+        try:
+            version = self.l2.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Not from a value an earlier version key has had, so no process mistakes it for its own
+            version = int(time.time() * 1000)
+            self.l2.set(VERSION_CACHE_KEY, version, None)
+        store = self._store
+        if store.version is None or version != store.version + 1:
+            # Someone else has written since we last checked
+            with store.lock:
+                store.entries.clear()
+        # Our own writes are applied to the in-process entries directly, so they needn't be dropped
+        store.version = version
+
+    def _l1_get(self, l1_key):
+        store = self._store
+        with store.lock:
+            entry = store.entries.get(l1_key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.time():
+                del store.entries[l1_key]
+                return False, None
+            store.entries.move_to_end(l1_key)
+            return True, entry[1]
+
+    def _l1_set(self, l1_key, value, timeout=DEFAULT_TIMEOUT):
+        timeout = self._l1_timeout if timeout in (DEFAULT_TIMEOUT, None) else min(timeout, self._l1_timeout)
+        if timeout <= 0:
+            self._l1_delete(l1_key)
+            return
+        store = self._store
+        with store.lock:
+            store.entries[l1_key] = (time.time() + timeout, value)
+            store.entries.move_to_end(l1_key)
+            while len(store.entries) > self._l1_max_entries:
+                store.entries.popitem(last=False)
+
+    def _l1_delete(self, l1_key):
+        with self._store.lock:
+            self._store.entries.pop(l1_key, None)
+
+    def get(self, key, default=None, version=None):
+        if not self._is_l1_key(key):
+            return self.l2.get(key, default, version=version)
+        self._check_version()
+        l1_key = (key, version)
+        found, value = self._l1_get(l1_key)
+        if found:
+            return value
+        value = self.l2.get(key, self, version=version)
+        if value is self:
+            return default
+        self._l1_set(l1_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        if self._is_l1_key(key):
+            self._bump_version()
+            self._l1_set((key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added and self._is_l1_key(key):
+            self._bump_version()
+            self._l1_set((key, version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version=version)
+        if self._is_l1_key(key):
+            self._bump_version()
+            self._l1_delete((key, version))
+
+    def get_many(self, keys, version=None):
+        l2_keys = [key for key in keys if not self._is_l1_key(key)]
+        values = self.l2.get_many(l2_keys, version=version) if l2_keys else {}
+        for key in keys:
+            if self._is_l1_key(key):
+                value = self.get(key, self, version=version)
+                if value is not self:
+                    values[key] = value
+        return values
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed_keys = self.l2.set_many(data, timeout, version=version)
+        l1_keys = [key for key in data if self._is_l1_key(key) and key not in failed_keys]
+        if l1_keys:
+            self._bump_version()
+            for key in l1_keys:
+                self._l1_set((key, version), data[key], timeout)
+        return failed_keys
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        if self._is_l1_key(key):
+            self._bump_version()
+            self._l1_delete((key, version))
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        previous_version = self.l2.get(VERSION_CACHE_KEY)
+        self.l2.clear()
+        # The other processes drop their in-process entries when they see the new version
+        version = max(previous_version or 0, int(time.time() * 1000)) + 1
+        self.l2.set(VERSION_CACHE_KEY, version, None)
+        with self._store.lock:
+            self._store.entries.clear()
+        self._store.version = version
+
+
+METRICS = ('hits', 'misses', 'sets', 'deletes', 'bytes_written', 'operations', 'latency_us')
+METRICS_PREFIXES_CACHE_KEY = 'cache_metrics_prefixes'
+
+
+def get_metric_cache_key(prefix, metric):
+    return 'cache_metrics_{}_{}'.format(prefix, metric)
+
+
+class MetricsRecorder(object):
+    """
+    Per-process cache metrics, added to totals in the shared cache every few seconds.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.flushed_at = time.time()
+
+    def record(self, prefix, **counts):
+        with self.lock:
+            for metric, count in counts.items():
+                key = (prefix, metric)
+                self.counts[key] = self.counts.get(key, 0) + count
+
+    def flush(self, cache, interval):
+        now = time.time()
+        if now - self.flushed_at < interval:
+            return
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            self.flushed_at = now
+        if not counts:
+            return
+        prefixes = set(prefix for prefix, metric in counts)
+        known_prefixes = cache.get(METRICS_PREFIXES_CACHE_KEY) or []
+        if not prefixes.issubset(known_prefixes):
+            cache.set(METRICS_PREFIXES_CACHE_KEY, sorted(prefixes.union(known_prefixes)), None)
+        for (prefix, metric), count in counts.items():
+            key = get_metric_cache_key(prefix, metric)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, None):
+                    cache.incr(key, count)
+
+
+_metrics_recorders = {}
+_metrics_recorders_lock = threading.Lock()
+
+
+def get_metrics_recorder(location):
+    with _metrics_recorders_lock:
+        return _metrics_recorders.setdefault(location, MetricsRecorder())
+
+
+class InstrumentedCache(BaseCache):
+    """
+    A cache backend that records hits, misses, sets, written bytes and latency of another cache per key prefix.
+
+    `LOCATION` is the alias of the cache to instrument in `CACHES`. The prefix of a key is
+    the longest of `OPTIONS['PREFIXES']` it starts with, or else its first word.
+    The totals over all processes are kept in the instrumented cache itself and
+    can be read with `get_cache_metrics()`.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._wrapped_alias = location
+        self._prefixes = sorted(options.get('PREFIXES', ()), key=len, reverse=True)
+        self._flush_interval = options.get('FLUSH_INTERVAL', 10)
+        self._recorder = get_metrics_recorder(location)
+
+    @cached_property
+    def wrapped(self):
+        return caches[self._wrapped_alias]
+
+    def get_prefix(self, key):
+        for prefix in self._prefixes:
+            if key.startswith(prefix):
+                return prefix
+        return re.split(r'[_.:-]', key, 1)[0] or 'other'
+
+    def _record(self, key, started_at, **counts):
+        latency_us = int((time.perf_counter() - started_at) * 1000000)
+        self._recorder.record(self.get_prefix(key), operations=1, latency_us=latency_us, **counts)
+        self._recorder.flush(self.wrapped, self._flush_interval)
+
+    def get(self, key, default=None, version=None):
+        started_at = time.perf_counter()
+        value = self.wrapped.get(key, self, version=version)
+        if value is self:
+            self._record(key, started_at, misses=1)
+            return default
+        self._record(key, started_at, hits=1)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        started_at = time.perf_counter()
+        self.wrapped.set(key, value, timeout, version=version)
+        self._record(key, started_at, sets=1, bytes_written=get_size(value))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        started_at = time.perf_counter()
+        added = self.wrapped.add(key, value, timeout, version=version)
+        if added:
+            self._record(key, started_at, sets=1, bytes_written=get_size(value))
+        else:
+            self._record(key, started_at)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        started_at = time.perf_counter()
+        touched = self.wrapped.touch(key, timeout, version=version)
+        self._record(key, started_at)
+        return touched
+
+    def delete(self, key, version=None):
+        started_at = time.perf_counter()
+        self.wrapped.delete(key, version=version)
+        self._record(key, started_at, deletes=1)
+
+    def get_many(self, keys, version=None):
+        started_at = time.perf_counter()
+        values = self.wrapped.get_many(keys, version=version)
+        latency_us = int((time.perf_counter() - started_at) * 1000000 / max(len(keys), 1))
+        for key in keys:
+            hit = key in values
+            self._recorder.record(
+                self.get_prefix(key), operations=1, latency_us=latency_us, hits=int(hit), misses=int(not hit),
+            )
+        self._recorder.flush(self.wrapped, self._flush_interval)
+        return values
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        started_at = time.perf_counter()
+        failed_keys = self.wrapped.set_many(data, timeout, version=version)
+        latency_us = int((time.perf_counter() - started_at) * 1000000 / max(len(data), 1))
+        for key, value in data.items():
+            self._recorder.record(
+                self.get_prefix(key), operations=1, latency_us=latency_us, sets=1, bytes_written=get_size(value),
+            )
+        self._recorder.flush(self.wrapped, self._flush_interval)
+        return failed_keys
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def incr(self, key, delta=1, version=None):
+        started_at = time.perf_counter()
+        value = self.wrapped.incr(key, delta, version=version)
+        self._record(key, started_at, sets=1)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.wrapped.clear()
+
+
+def get_size(value):
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def get_cache_metrics(alias='default'):
+    """
+    Get the metrics recorded by an `InstrumentedCache`, totalled over all processes.
+
+    :param alias: Alias of the instrumented cache in `CACHES`
+    :type alias: str
+    :return: Dicts of `prefix` and the metrics in `METRICS`, most used prefix first
+    :rtype: list[dict]
+    """
+    instrumented = caches[alias]
+    if not isinstance(instrumented, InstrumentedCache):
+        return []
+    instrumented._recorder.flush(instrumented.wrapped, 0)
+    prefixes = instrumented.wrapped.get(METRICS_PREFIXES_CACHE_KEY) or []
+    values = instrumented.wrapped.get_many([
+        get_metric_cache_key(prefix, metric) for prefix in prefixes for metric in METRICS
+    ])
+    rows = []
+    for prefix in prefixes:
+        row = {'cache': alias, 'prefix': prefix}
+        for metric in METRICS:
+            row[metric] = values.get(get_metric_cache_key(prefix, metric), 0)
+        reads = row['hits'] + row['misses']
+        row['hit_ratio'] = row['hits'] / reads if reads else None
+        row['average_latency_ms'] = row['latency_us'] / row['operations'] / 1000 if row['operations'] else None
+        row['average_size'] = row['bytes_written'] // row['sets'] if row['sets'] else None
+        rows.append(row)
+    rows.sort(key=lambda row: row['operations'], reverse=True)
+    return rows
+
+
+def get_all_cache_metrics():
+    """
+    Get the metrics of all instrumented caches in `CACHES`.
+
+    :rtype: list[dict]
+    """
+    rows = []
+    for alias in settings.CACHES:
+        rows.extend(get_cache_metrics(alias))
+    return rows
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus_metrics(rows):
+    """
+    Format cache metrics in the Prometheus text exposition format.
+
+    :param rows: Metrics as returned by `get_cache_metrics()`
+    :type rows: list[dict]
+    :rtype: str
+    """
+    lines = []
+    for metric, name in (
+        ('hits', 'digihel_cache_hits_total'),
+        ('misses', 'digihel_cache_misses_total'),
+        ('sets', 'digihel_cache_sets_total'),
+        ('deletes', 'digihel_cache_deletes_total'),
+        ('bytes_written', 'digihel_cache_written_bytes_total'),
+        ('operations', 'digihel_cache_operations_total'),
+        ('latency_us', 'digihel_cache_latency_seconds_total'),
+    ):
+        lines.append('# TYPE {} counter'.format(name))
+        for row in rows:
+            value = row[metric] / 1000000 if metric == 'latency_us' else row[metric]
+            lines.append('{}{{cache="{}",prefix="{}"}} {}'.format(
+                name, escape_label(row['cache']), escape_label(row['prefix']), value,
+            ))
+    return '\n'.join(lines) + '\n'
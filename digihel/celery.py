@@ -15,3 +15,6 @@ app = Celery('digihel')
 # pickle the object when using Windows.
 app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+# Connects the task signals that carry traces from requests to tasks
+import digihel.tracing  # noqa
@@ -0,0 +1,310 @@
+"""
+A local stand-in for the external APIs of the site, for developing and benchmarking offline.
+
+Responses recorded from the news feed, LinkedEvents, Facebook Graph, HRI, Open311,
+Respa and Twitter are served from `upstream_fixtures/`, together with generated
+avatars and a Slack webhook. The latency, error rate and number of items in the
+responses can be set. Run the server with `./manage.py run_fake_upstream` and point
+the site at it with the `FAKE_UPSTREAM_URL` environment variable.
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import socketserver
+import ssl
+import struct
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'upstream_fixtures')
+RSS_ITEM_RE = re.compile(r'<item>.*?</item>', re.S)
+RECORDED_ITEMS = 20
+
+# Fixture file -> the real URL it is recorded from
+RECORD_SOURCES = {
+    'news.xml': 'http://www.hel.fi/feeds/uuttahelsinkia.xml',
+    'linkedevents_events.json': (
+        'https://api.hel.fi/linkedevents/v1/event/?keyword=yso:p8692,yso:p26655'
+        '&include=location&sort=-end_time&page_size=20'
+    ),
+    'hri_package_list.json': 'http://hri.fi/api/3/action/package_list',
+    'open311_requests.json': 'https://asiointi.hel.fi/palautews/rest/v1/requests.json?status=closed',
+    'respa_reservations.json': 'https://api.hel.fi/respa/v1/reservation?all=true&page_size=20',
+}
+
+
+class FakeUpstreamConfig(object):
+    """
+    How the fake upstream responds.
+
+    :param latency: Average response time in milliseconds
+    :type latency: int
+    :param jitter: Maximum deviation from the average response time in milliseconds
+    :type jitter: int
+    :param error_rate: Share of requests that fail, from 0 to 1
+    :type error_rate: float
+    :param items: Number of items in list responses; as recorded if None
+    :type items: int|None
+    """
+
+    def __init__(self, latency=0, jitter=0, error_rate=0.0, items=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.items = items
+        self.random = random.Random(seed)
+
+    def wait(self):
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def should_fail(self):
+        return self.random.random() < self.error_rate
+
+
+def response(body, content_type='application/json', status=200, headers=None):
+    if not isinstance(body, bytes):
+        if not isinstance(body, str):
+            body = json.dumps(body, ensure_ascii=False)
+        body = body.encode('utf8')
+    return status, content_type, body, headers or {}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf8') as f:
+        return f.read()
+
+
+def make_unique(item, round, id_fields):
+    """
+    Make a copy of a repeated item distinct from the earlier copies.
+    """
+    if isinstance(item, str):
+        return '{}-{}'.format(item, round)
+    item = copy.deepcopy(item)
+    for field in id_fields:
+        value = item.get(field)
+        if isinstance(value, int):
+            item[field] = value + round * 10 ** 9
+        elif value is not None:
+            item[field] = '{}-{}'.format(value, round)
+    return item
+
+
+def repeat_items(items, count, id_fields=('id',)):
+    """
+    Cycle through `items` to make a list of `count` items with distinct ids.
+
+    :rtype: list
+    """
+    if count is None or not items:
+        return items
+    return [
+        items[i] if i < len(items) else make_unique(items[i % len(items)], i // len(items), id_fields)
+        for i in range(count)
+    ]
+
+
+def news_feed(config, path, query):
+    feed = load_fixture('news.xml')
+    items = RSS_ITEM_RE.findall(feed)
+    if config.items is not None and items:
+        start = feed.index(items[0])
+        end = feed.rindex(items[-1]) + len(items[-1])
+        repeated = []
+        for i in range(config.items):
+            item = items[i % len(items)]
+            round = i // len(items)
+            if round:
+                item = item.replace('</link>', '-{}</link>'.format(round))
+                item = item.replace('</guid>', '-{}</guid>'.format(round))
+            repeated.append(item)
+        feed = feed[:start] + '\n'.join(repeated) + feed[end:]
+    return response(feed, 'application/rss+xml; charset=utf-8')
+
+
+def make_png(size, color):
+    """
+    Make a PNG image of a single color.
+    """
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    row = b'\x00' + bytes(color) * size
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(row * size)),
+        chunk(b'IEND', b''),
+    ])
+
+
+def avatar(config, path, query):
+    try:
+        size = min(int(query.get('s', ['80'])[0]), 512)
+    except ValueError:
+        size = 80
+    color = hashlib.md5(path.encode('utf8')).digest()[:3]
+    return response(make_png(size, color), 'image/png')
+
+
+def list_fixture(fixture, list_key=None, id_fields=('id',)):
+    """
+    Make a responder for a recorded JSON response with a list of items.
+
+    :param list_key: Key of the list in the response; None if the response is the list
+    """
+    def respond(config, path, query):
+        data = json.loads(load_fixture(fixture))
+        if list_key is None:
+            return response(repeat_items(data, config.items, id_fields))
+        data[list_key] = repeat_items(data[list_key], config.items, id_fields)
+        if config.items is not None:
+            if 'count' in data:
+                data['count'] = config.items
+            if 'count' in data.get('meta', {}):
+                data['meta']['count'] = config.items
+        return response(data)
+    return respond
+
+
+def facebook(config, path, query):
+    if 'ids' in query:
+        template = json.loads(load_fixture('facebook_event.json'))
+        return response({
+            event_id: dict(template, id=event_id) for event_id in query['ids'][0].split(',')
+        })
+    data = json.loads(load_fixture('facebook_feed.json'))
+    data['feed']['data'] = repeat_items(data['feed']['data'], config.items, ('id', 'object_id'))
+    return response(data)
+
+
+def slack(config, path, query):
+    return response('ok', 'text/plain')
+
+
+def error_response(name):
+    if name == 'slack':
+        return response('rate_limited', 'text/plain', 429, {'Retry-After': '1'})
+    return response({'detail': 'Fake upstream error'}, status=503)
+
+
+# (name, method, path prefix, responder)
+ROUTES = [
+    ('news', 'GET', '/news/feed.xml', news_feed),
+    ('avatar', 'GET', '/avatar/', avatar),
+    ('linkedevents', 'GET', '/linkedevents/v1/event/', list_fixture('linkedevents_events.json', 'data')),
+    ('facebook', 'GET', '/facebook/v2.5/', facebook),
+    ('hri', 'GET', '/hri/api/3/action/package_list', list_fixture('hri_package_list.json', 'result')),
+    ('open311', 'GET', '/open311/v1/requests.json', list_fixture(
+        'open311_requests.json', id_fields=('service_request_id',),
+    )),
+    ('respa', 'GET', '/respa/v1/reservation', list_fixture('respa_reservations.json', 'results')),
+    ('twitter', 'GET', '/1.1/search/tweets.json', list_fixture('twitter_search.json', 'statuses', ('id', 'id_str'))),
+    ('slack', 'POST', '/slack/', slack),
+]
+
+
+def find_route(method, path):
+    for name, route_method, prefix, responder in ROUTES:
+        if method == route_method and path.startswith(prefix):
+            return name, responder
+    return None
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond('GET')
+
+    def do_POST(self):
+        self.respond('POST')
+
+    def respond(self, method):
+        config = self.server.config
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        route = find_route(method, url.path)
+        config.wait()
+        if route is None:
+            status, content_type, body, headers = response({'detail': 'Not found'}, status=404)
+        elif config.should_fail():
+            status, content_type, body, headers = error_response(route[0])
+        else:
+            status, content_type, body, headers = route[1](config, url.path, parse_qs(url.query))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeUpstreamServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config, verbose=False):
+        super().__init__(address, FakeUpstreamHandler)
+        self.config = config
+        self.verbose = verbose
+
+
+def make_server(host, port, config, certfile=None, keyfile=None, verbose=False):
+    """
+    Make a fake upstream server; call `serve_forever()` on it to start serving.
+
+    Twitter is only reached over HTTPS, so give a certificate to serve it too.
+
+    :param config: How the server responds
+    :type config: FakeUpstreamConfig
+    :param certfile: Certificate to serve HTTPS with, instead of HTTP
+    :type certfile: str|None
+    :rtype: FakeUpstreamServer
+    """
+    server = FakeUpstreamServer((host, port), config, verbose)
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server
+
+
+def truncate_lists(data, count):
+    if isinstance(data, list):
+        return data[:count]
+    return {key: value[:count] if isinstance(value, list) else value for key, value in data.items()}
+
+
+def record_fixtures(stdout=None):
+    """
+    Refresh the fixtures of the public APIs from the real services.
+
+    Facebook and Twitter need credentials, so their fixtures are maintained by hand.
+    """
+    for fixture, url in sorted(RECORD_SOURCES.items()):
+        resp = requests.get(url, timeout=30)
+        resp.raise_for_status()
+        if fixture.endswith('.json'):
+            content = json.dumps(truncate_lists(resp.json(), RECORDED_ITEMS), ensure_ascii=False, indent=2) + '\n'
+        else:
+            content = resp.content.decode(resp.encoding or 'utf8')
+        with open(os.path.join(FIXTURE_DIR, fixture), 'w', encoding='utf8') as f:
+            f.write(content)
+        if stdout:
+            stdout.write('Recorded {} from {}'.format(fixture, url))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from digihel.synthetic import generate_site
+
+
+class Command(BaseCommand):
+    help = (
+        'Replaces all pages, people and feedback with a synthetic site of the given size, for benchmarking. '
+        'Never run in production!'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('size', type=int, help='Approximate number of pages, e.g. 1000 or 50000')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--yes', action='store_true', help='Don\'t ask for confirmation')
+
+    def handle(self, *args, **options):
+        if not options['yes']:
+            answer = input('This deletes all pages, people and feedback. Continue? [y/N] ')
+            if answer.lower() != 'y':
+                raise CommandError('Cancelled')
+        with transaction.atomic():
+            site = generate_site(options['size'], options['seed'])
+        self.stdout.write(self.style.SUCCESS('Successfully generated {} pages and {} people'.format(
+            site['page_count'], len(site['people']),
+        )))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from digihel.fake_upstream import FakeUpstreamConfig, make_server, record_fixtures
+
+
+class Command(BaseCommand):
+    help = 'Serves recorded responses of the external APIs locally, for developing and benchmarking offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('addrport', nargs='?', default='127.0.0.1:8001', help='Address and port to listen on')
+        parser.add_argument('--latency', type=int, default=0, help='Average response time in milliseconds')
+        parser.add_argument('--jitter', type=int, default=0, help='Maximum deviation from the latency in milliseconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests that fail, e.g. 0.05')
+        parser.add_argument('--items', type=int, help='Number of items in list responses (default: as recorded)')
+        parser.add_argument('--seed', type=int, help='Seed for the latencies and errors')
+        parser.add_argument('--certfile', help='Certificate for serving HTTPS, needed for Twitter')
+        parser.add_argument('--keyfile', help='Private key of the certificate, if not in the certificate file')
+        parser.add_argument('--record', action='store_true',
+                            help='Refresh the fixtures from the real services and exit')
+
+    def handle(self, *args, **options):
+        if options['record']:
+            record_fixtures(self.stdout)
+            return
+        host, _, port = options['addrport'].rpartition(':')
+        try:
+            port = int(port)
+        except ValueError:
+            raise CommandError('"{}" is not a valid port'.format(port))
+        if not 0 <= options['error_rate'] <= 1:
+            raise CommandError('The error rate must be between 0 and 1')
+        config = FakeUpstreamConfig(
+            latency=options['latency'], jitter=options['jitter'], error_rate=options['error_rate'],
+            items=options['items'], seed=options['seed'],
+        )
+        server = make_server(
+            host or '127.0.0.1', port, config, options['certfile'], options['keyfile'],
+            verbose=(options['verbosity'] > 1),
+        )
+        scheme = 'https' if options['certfile'] else 'http'
+        self.stdout.write('Serving fake upstream APIs; run the site with FAKE_UPSTREAM_URL={}://{}:{}/'.format(
+            scheme, *server.server_address[:2]
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,7 +1,10 @@
+from django.core.cache import cache
 from django.urls import reverse
 from wagtail.core.models import Page, Site
 from wagtail.core.utils import WAGTAIL_APPEND_SLASH
 
+TEST_SITE_IDS_CACHE_KEY = 'digihel_test_site_ids'
+
 
 class RelativeURLMixin(object):
     def relative_url(self, current_site, request=None):
@@ -18,44 +21,97 @@ class RelativeURLMixin(object):
     # Override the method to support the case where we have
     # one Site for testing and another for production.
     def get_url_parts(self, request=None):
-        possible_sites = [
-            (pk, path, url)
-            for pk, path, url in self._get_site_root_paths(request)
-            if self.url_path.startswith(path)
-        ]
-
-        if not possible_sites:
-            return None
-
-        test_site_paths = set([x for x in possible_sites if 'test' in Site.objects.get(id=x[0]).site_name.lower()])
-        prod_site_paths = set(possible_sites) - test_site_paths
-        if False and self.content_type.app_label == 'kehmet':
-            possible_sites = list(test_site_paths)
-        else:
-            possible_sites = list(prod_site_paths)
+        return get_url_parts_for_path(
+            self.url_path, self._get_site_root_paths(request), get_test_site_ids(request), request
+        )
+
+
+def get_test_site_ids(request=None):
+    """
+    Get the ids of the Sites meant for testing, i.e. ones with "test" in their name.
+
+    The result is cached until a Site changes, like the site root paths of Wagtail,
+    and memoized on the request, if one is given.
+    """
+    test_site_ids = getattr(request, '_test_site_ids', None)
+    if test_site_ids is None:
+        test_site_ids = cache.get(TEST_SITE_IDS_CACHE_KEY)
+        if test_site_ids is None:
+            test_site_ids = set(Site.objects.filter(site_name__icontains='test').values_list('id', flat=True))
+            cache.set(TEST_SITE_IDS_CACHE_KEY, test_site_ids, None)
+        if request is not None:
+            request._test_site_ids = test_site_ids
+    return test_site_ids
 
-        if len(possible_sites) == 0:
-            return None
 
-        site_id, root_path, root_url = possible_sites[0]
+def clear_test_site_ids():
+    cache.delete(TEST_SITE_IDS_CACHE_KEY)
 
-        if hasattr(request, 'site'):
-            for site_id, root_path, root_url in possible_sites:
-                if site_id == request.site.pk:
-                    break
-            else:
-                site_id, root_path, root_url = possible_sites[0]
 
-        page_path = reverse(
-            'wagtail_serve', args=(self.url_path[len(root_path):],))
+def get_url_parts_for_path(url_path, site_root_paths, test_site_ids, request=None):
+    possible_sites = [
+        (pk, path, url)
+        for pk, path, url in site_root_paths
+        if url_path.startswith(path) and pk not in test_site_ids
+    ]
 
-        # Remove the trailing slash from the URL reverse generates if
-        # WAGTAIL_APPEND_SLASH is False and we're not trying to serve
-        # the root path
-        if not WAGTAIL_APPEND_SLASH and page_path != '/':
-            page_path = page_path.rstrip('/')
+    if len(possible_sites) == 0:
+        return None
 
-        return (site_id, root_url, page_path)
+    site_id, root_path, root_url = possible_sites[0]
+
+    if hasattr(request, 'site'):
+        for site_id, root_path, root_url in possible_sites:
+            if site_id == request.site.pk:
+                break
+        else:
+            site_id, root_path, root_url = possible_sites[0]
+
+    page_path = reverse(
+        'wagtail_serve', args=(url_path[len(root_path):],))
+
+    # Remove the trailing slash from the URL reverse generates if
+    # WAGTAIL_APPEND_SLASH is False and we're not trying to serve
+    # the root path
+    if not WAGTAIL_APPEND_SLASH and page_path != '/':
+        page_path = page_path.rstrip('/')
+
+    return (site_id, root_url, page_path)
+
+
+def get_page_urls(pages, request=None):
+    """
+    Compute the URLs of many pages at once, as `Page.url` would.
+
+    Only the `url_path` of the pages is used, and the site root paths are
+    looked up only once for all of the pages.
+
+    :param pages: Page objects
+    :type pages: iterable[wagtail.core.models.Page]
+    :return: Dict of page id to URL
+    :rtype: dict[int, str]
+    """
+    if request is None:
+        site_root_paths = Site.get_site_root_paths()
+    else:
+        # Shared with Page._get_site_root_paths()
+        if not hasattr(request, '_wagtail_cached_site_root_paths'):
+            request._wagtail_cached_site_root_paths = Site.get_site_root_paths()
+        site_root_paths = request._wagtail_cached_site_root_paths
+    test_site_ids = get_test_site_ids(request)
+    current_site = getattr(request, 'site', None)
+    urls = {}
+    for page in pages:
+        url_parts = get_url_parts_for_path(page.url_path, site_root_paths, test_site_ids, request)
+        if url_parts is None:
+            urls[page.pk] = None
+            continue
+        site_id, root_url, page_path = url_parts
+        if (current_site is not None and site_id == current_site.id) or len(site_root_paths) == 1:
+            urls[page.pk] = page_path
+        else:
+            urls[page.pk] = root_url + page_path
+    return urls
 
 
 # Monkeypatch the original relative_url...
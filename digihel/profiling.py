@@ -0,0 +1,213 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.library import InclusionNode, SimpleNode
+from django.utils.timezone import now
+
+SLOWEST_CACHE_KEY = 'profiling_slowest_requests'
+PROFILING_MODULE_FILE = os.path.splitext(__file__)[0]
+
+_local = threading.local()
+
+
+def get_current_profile():
+    return getattr(_local, 'profile', None)
+
+
+class RequestProfile(object):
+    """
+    The queries and template tag timings of one request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.page_type = None
+        self.started_at = time.perf_counter()
+        self.queries = []  # (sql, params, seconds, call site)
+        self.tag_times = defaultdict(lambda: [0, 0.0])  # tag name -> [count, seconds]
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        call_site = get_call_site()
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, time.perf_counter() - started_at, call_site))
+
+    def add_tag_time(self, name, seconds):
+        timing = self.tag_times[name]
+        timing[0] += 1
+        timing[1] += seconds
+
+    def get_duplicate_queries(self):
+        queries = defaultdict(list)
+        for sql, params, seconds, call_site in self.queries:
+            queries[(sql, repr(params))].append(call_site)
+        duplicates = [
+            {'sql': sql, 'count': len(call_sites), 'call_sites': sorted(set(call_sites))}
+            for (sql, params), call_sites in queries.items() if len(call_sites) > 1
+        ]
+        duplicates.sort(key=lambda duplicate: duplicate['count'], reverse=True)
+        return duplicates[:10]
+
+    def to_dict(self, response):
+        return {
+            'time': now(),
+            'method': self.request.method,
+            'url': self.request.get_full_path(),
+            'page_type': self.page_type,
+            'status': response.status_code,
+            'duration_ms': (time.perf_counter() - self.started_at) * 1000,
+            'query_count': len(self.queries),
+            'query_ms': sum(query[2] for query in self.queries) * 1000,
+            'duplicate_queries': self.get_duplicate_queries(),
+            'tags': sorted((
+                {'name': name, 'count': count, 'ms': seconds * 1000}
+                for name, (count, seconds) in self.tag_times.items()
+            ), key=lambda tag: tag['ms'], reverse=True),
+        }
+
+
+def get_call_site():
+    """
+    Return the innermost frame of project code that led to the current call, as `path:line in function`.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        in_project = filename.startswith(settings.BASE_DIR) and 'site-packages' not in filename
+        if in_project and not filename.startswith(PROFILING_MODULE_FILE):
+            return '{}:{} in {}'.format(
+                os.path.relpath(filename, settings.BASE_DIR), frame.f_lineno, frame.f_code.co_name,
+            )
+        frame = frame.f_back
+    return None
+
+
+def get_file_url_prefixes():
+    """
+    Get the URL prefixes of the static and media files, which are not profiled or traced.
+
+    Only prefixes on this host are returned; files served from other hosts never reach Django.
+
+    :rtype: tuple[str]
+    """
+    return tuple(url for url in (settings.STATIC_URL, settings.MEDIA_URL) if url and url.startswith('/'))
+
+
+def set_profiled_page(request, page):
+    profile = get_current_profile()
+    if profile is not None and profile.request is request:
+        profile.page_type = page.specific_class.__name__
+
+
+def profile_node_class(node_class, get_name):
+    """
+    Record the time spent rendering nodes of the given template node class as template tag time.
+    """
+    original_render = node_class.render
+
+    @functools.wraps(original_render)
+    def render(self, context):
+        profile = get_current_profile()
+        if profile is None:
+            return original_render(self, context)
+        started_at = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            profile.add_tag_time(get_name(self), time.perf_counter() - started_at)
+
+    render.profiled = True
+    node_class.render = render
+
+
+def profile_template_tags():
+    from content.templatetags.content_tags import TableOfContentsNode
+
+    if getattr(SimpleNode.render, 'profiled', False):
+        return
+    profile_node_class(SimpleNode, lambda node: node.func.__name__)
+    profile_node_class(InclusionNode, lambda node: node.func.__name__)
+    profile_node_class(TableOfContentsNode, lambda node: 'do_table_of_contents')
+
+
+def record_profile(entry):
+    """
+    Keep the entry if it is one of the `PROFILING_SLOWEST_COUNT` slowest requests seen.
+
+    The slowest requests are kept in the cache to share them between processes;
+    concurrent requests may occasionally overwrite each other's entries.
+    """
+    count = getattr(settings, 'PROFILING_SLOWEST_COUNT', 50)
+    slowest = cache.get(SLOWEST_CACHE_KEY) or []
+    if len(slowest) >= count and entry['duration_ms'] <= slowest[-1]['duration_ms']:
+        return
+    slowest.append(entry)
+    slowest.sort(key=lambda entry: entry['duration_ms'], reverse=True)
+    cache.set(SLOWEST_CACHE_KEY, slowest[:count], None)
+
+
+def get_slowest_requests():
+    return cache.get(SLOWEST_CACHE_KEY) or []
+
+
+def summarize_by_page_type(entries):
+    """
+    Average the recorded requests per page type.
+
+    :param entries: Recorded requests
+    :type entries: list[dict]
+    :rtype: list[dict]
+    """
+    summaries = {}
+    for entry in entries:
+        page_type = entry['page_type'] or '-'
+        summary = summaries.setdefault(page_type, {
+            'page_type': page_type, 'count': 0, 'duration_ms': 0.0, 'query_count': 0, 'query_ms': 0.0,
+        })
+        summary['count'] += 1
+        for field in ('duration_ms', 'query_count', 'query_ms'):
+            summary[field] += entry[field]
+    for summary in summaries.values():
+        for field in ('duration_ms', 'query_count', 'query_ms'):
+            summary[field] /= summary['count']
+    return sorted(summaries.values(), key=lambda summary: summary['duration_ms'], reverse=True)
+
+
+class ProfilingMiddleware(object):
+    """
+    Record query counts and times, duplicate queries and template tag times of each request.
+
+    Only enabled when `PROFILING_ENABLED` is set, as it slows every request down.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.unprofiled_prefixes = get_file_url_prefixes()
+        profile_template_tags()
+
+    def __call__(self, request):
+        if self.unprofiled_prefixes and request.path.startswith(self.unprofiled_prefixes):
+            return self.get_response(request)
+        profile = _local.profile = RequestProfile(request)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        record_profile(profile.to_dict(response))
+        return response
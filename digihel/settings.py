@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'wagtail.core',
     'wagtail.contrib.modeladmin',
     'wagtail.contrib.table_block',
+    'wagtail.contrib.postgres_search',
 
     'compressor',
     'modelcluster',
@@ -82,6 +83,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'digihel.profiling.ProfilingMiddleware',
+    'digihel.tracing.TracingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -132,6 +135,15 @@ DATABASES = {
 CELERY_RESULT_BACKEND = 'django-db'
 BROKER_URL = 'redis://localhost:6379/0'
 
+# The cache must be shared by all the processes: invalidating the cached pages,
+# people and API ETags relies on counters kept in it
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'redis://localhost:6379/1'),
+    },
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/1.9/topics/i18n/
@@ -197,6 +209,59 @@ NEWS_FEED_URL = "http://www.hel.fi/feeds/uuttahelsinkia.xml"
 NEWS_FEED_DEFAULT_IMAGE = "/static/hel-bootstrap-3/src/assets/helsinki-logo-black.svg"
 NEWS_FEED_CACHE_TIMEOUT = 3600
 
+AVATAR_API_URL = "https://api.hel.fi/avatar/"
+
+LINKEDEVENTS_API_URL = "https://api.hel.fi/linkedevents/v1/"
+FACEBOOK_GRAPH_API_URL = "https://graph.facebook.com/v2.5/"
+HRI_API_URL = "http://hri.fi/api/3/"
+OPEN311_API_URL = "https://asiointi.hel.fi/palautews/rest/v1/"
+RESPA_API_URL = "https://api.hel.fi/respa/v1/"
+TWITTER_API_HOST = "api.twitter.com"
+
+# Point the external APIs at a local fake upstream server (`manage.py run_fake_upstream`),
+# e.g. FAKE_UPSTREAM_URL=http://127.0.0.1:8001/
+FAKE_UPSTREAM_URL = os.environ.get('FAKE_UPSTREAM_URL')
+if FAKE_UPSTREAM_URL:
+    NEWS_FEED_URL = FAKE_UPSTREAM_URL + 'news/feed.xml'
+    AVATAR_API_URL = FAKE_UPSTREAM_URL + 'avatar/'
+    LINKEDEVENTS_API_URL = FAKE_UPSTREAM_URL + 'linkedevents/v1/'
+    FACEBOOK_GRAPH_API_URL = FAKE_UPSTREAM_URL + 'facebook/v2.5/'
+    HRI_API_URL = FAKE_UPSTREAM_URL + 'hri/api/3/'
+    OPEN311_API_URL = FAKE_UPSTREAM_URL + 'open311/v1/'
+    RESPA_API_URL = FAKE_UPSTREAM_URL + 'respa/v1/'
+    TWITTER_API_HOST = FAKE_UPSTREAM_URL.split('://', 1)[-1].rstrip('/')
+
+SEARCH_RESULT_CACHE_TIMEOUT = 600
+SEARCH_RESULT_CACHE_SIZE = 200
+SEARCH_SUGGEST_REBUILD_INTERVAL = 3600
+SEARCH_SUGGEST_POPULAR_QUERIES = 200
+SEARCH_INDEX_FLUSH_DELAY = 10
+SEARCH_INDEX_BATCH_SIZE = 200
+
+FEEDBACK_DIGEST_WINDOW = 60
+FEEDBACK_DIGEST_MAX_ITEMS = 20
+FEEDBACK_DELIVERY_MAX_ATTEMPTS = 5
+FEEDBACK_THROTTLE_RATES = {
+    'feedback_ip': '10/hour',
+    'feedback_url': '60/hour',
+}
+FEEDBACK_DUPLICATE_WINDOW = 600
+FEEDBACK_EXPORT_CHUNK_SIZE = 2000
+
+# Token for reading the Prometheus metrics, sent as `Authorization: Bearer <token>`
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Record queries and template tag times of every request; slows requests down
+PROFILING_ENABLED = (os.environ.get('PROFILING') == '1')
+PROFILING_SLOWEST_COUNT = 50
+
+# Record traces of requests and Celery tasks
+TRACING_ENABLED = (os.environ.get('TRACING') == '1')
+TRACING_EXPORTER = 'digihel.tracing.MemoryExporter'
+TRACING_FILE = os.path.join(BASE_DIR, 'traces.jsonl')
+TRACING_KEEP_TRACES = 100
+TRACING_MAX_SPANS = 2000
+
 # Wagtail settings
 
 WAGTAIL_SITE_NAME = "digihel"
@@ -219,6 +284,14 @@ if CI:
             'TIMEOUT': 5,
         },
     }
+else:
+    # Use PostgreSQL full-text search instead of the (slow) database backend
+    # when Elasticsearch is not available.
+    WAGTAILSEARCH_BACKENDS = {
+        'default': {
+            'BACKEND': 'search.postgres_backend',
+        },
+    }
 
 
 # local_settings.py can be used to override environment-specific settings
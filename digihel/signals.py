@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.core.models import Site
+
+from .mixins import clear_test_site_ids
+
+
+@receiver(post_save, sender=Site, dispatch_uid='digihel_clear_test_site_ids_on_save')
+@receiver(post_delete, sender=Site, dispatch_uid='digihel_clear_test_site_ids_on_delete')
+def clear_test_site_ids_on_site_change(sender, **kwargs):
+    clear_test_site_ids()
@@ -25,4 +25,31 @@ $(function() {
 
     $('.match-height').matchHeight();
 
+    $('input[data-suggest-url]').each(function(index) {
+        var $input = $(this);
+        var listId = 'search-suggestions-' + index;
+        var $list = $('<datalist>').attr('id', listId).insertAfter($input);
+        var timer = null;
+        $input.attr('list', listId);
+        $input.on('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                var query = $input.val();
+                if (!query) {
+                    $list.empty();
+                    return;
+                }
+                $.getJSON($input.data('suggest-url'), {q: query}, function(data) {
+                    if (data.query !== $input.val()) {
+                        return;
+                    }
+                    $list.empty();
+                    $.each(data.suggestions, function(i, suggestion) {
+                        $('<option>').attr('value', suggestion).appendTo($list);
+                    });
+                });
+            }, 150);
+        });
+    });
+
 });
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+Generate synthetic sites of a given size, for benchmarks and query count tests.
+
+The generated tree mirrors the real site: themes with projects, a guide,
+a Kehmet hierarchy and plain content pages, plus people with their groups
+and roles, and feedback on the pages.
+"""
+import random
+
+from django.contrib.contenttypes.models import ContentType
+from django.utils.timezone import now
+from wagtail.core.models import Page, Site
+from wagtail.core.rich_text import RichText
+
+from content.models import ContentPage, LinkedContentPage, LinkedContentPageRole
+from digi.models import (
+    FrontPage, GuideContentPage, GuideFrontPage, ProjectPage, ProjectRole, ThemeIndexPage, ThemePage, ThemeRole
+)
+from events.models import EventsIndexPage
+from feedback.models import Feedback
+from feedback.stats import rebuild_stats
+from kehmet.models import KehmetContentPage, KehmetFrontPage
+from news.models import NewsIndexPage
+from people.cache import bump_change_counter
+from people.models import Group, Membership, Person, PersonIndexPage
+
+WORDS = (
+    'digitaalinen', 'helsinki', 'palvelu', 'kaupunki', 'asukas', 'kokeilu', 'avoin', 'data', 'rajapinta',
+    'kehitys', 'ohje', 'tuki', 'verkkosivu', 'sähköinen', 'asiointi', 'hanke', 'opas', 'turvallisuus',
+    'saavutettavuus', 'pilvi', 'hankinta', 'arkkitehtuuri', 'käyttäjä', 'tutkimus', 'yhteistyö',
+)
+FIRST_NAMES = ('Aino', 'Eero', 'Helmi', 'Ilmari', 'Kaisa', 'Lauri', 'Minna', 'Onni', 'Sanna', 'Ville')
+LAST_NAMES = ('Virtanen', 'Korhonen', 'Mäkinen', 'Nieminen', 'Hämäläinen', 'Laine', 'Heikkinen', 'Koskinen')
+
+# The type of the children of each type of page
+CHILD_TYPES = {
+    FrontPage: ContentPage,
+    ThemeIndexPage: ThemePage,
+    ThemePage: ProjectPage,
+    GuideFrontPage: GuideContentPage,
+    GuideContentPage: GuideContentPage,
+    KehmetFrontPage: KehmetContentPage,
+    KehmetContentPage: KehmetContentPage,
+}
+
+# Shares of the generated pages
+THEME_SHARE = 0.2
+GUIDE_SHARE = 0.3
+KEHMET_SHARE = 0.2
+CONTENT_SHARE = 0.3
+
+
+class SiteGenerator(object):
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.random = random.Random(seed)
+        self.page_count = 0
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for i in range(count))
+
+    def title(self):
+        return self.words(self.random.randint(2, 4)).capitalize()
+
+    def body(self, heading_count=3, heading_blocks=True):
+        """
+        Make a StreamField body of `heading_count` sections.
+
+        :param heading_blocks: Whether to start each section with a heading block; bodies
+                               that only allow paragraphs get the heading in the paragraph only
+        :type heading_blocks: bool
+        """
+        body = []
+        for i in range(heading_count):
+            if heading_blocks:
+                body.append(('heading', self.title()))
+            body.append(('paragraph', RichText('<h2>{}</h2><p>{}.</p><p>{}.</p>'.format(
+                self.title(), self.words(40).capitalize(), self.words(30).capitalize(),
+            ))))
+        return body
+
+    def add(self, parent, page):
+        page.live = True
+        if not page.title:
+            page.title = self.title()
+        page.slug = 'page-{:08x}'.format(self.random.getrandbits(32))
+        parent.add_child(instance=page)
+        self.page_count += 1
+        return page
+
+    def add_tree(self, parent, count, branching, make_page):
+        """
+        Add `count` pages under `parent`, breadth first, at most `branching` children per page.
+
+        :return: The added pages, in the order they were added
+        :rtype: list[Page]
+        """
+        pages = []
+        parents = [parent]
+        while len(pages) < count:
+            next_parents = []
+            for tree_parent in parents:
+                for i in range(min(branching, count - len(pages))):
+                    page = self.add(tree_parent, make_page(len(pages) < branching))
+                    pages.append(page)
+                    next_parents.append(page)
+                if len(pages) >= count:
+                    break
+            parents = next_parents
+        return pages
+
+    def make_page(self, page_class, **kwargs):
+        if page_class in (ThemePage, ProjectPage):
+            kwargs.setdefault('short_description', self.words(20))
+            kwargs.setdefault('body', self.body(2, heading_blocks=False))
+        elif page_class is GuideContentPage:
+            kwargs.setdefault('body', self.body())
+            kwargs.setdefault('sidebar', self.body(1))
+        else:
+            kwargs.setdefault('body', self.body())
+        return page_class(**kwargs)
+
+    def add_children(self, parent, count):
+        """
+        Add `count` children of the type the parent has on the real site.
+
+        Pages with roles also get `count` roles, and a person index gets `count` more people.
+
+        :param parent: Page to add the children to
+        :type parent: wagtail.core.models.Page
+        :param count: Number of children
+        :type count: int
+        """
+        parent = parent.specific
+        if isinstance(parent, PersonIndexPage):
+            self.generate_people([], [], [], count)
+            return
+        if isinstance(parent, (NewsIndexPage, EventsIndexPage)):
+            # Their items come from external services
+            return
+        child_class = CHILD_TYPES.get(type(parent), ContentPage)
+        for i in range(count):
+            self.add(parent, self.make_page(child_class, show_in_menus=True))
+        if hasattr(parent, 'roles'):
+            relation = parent._meta.get_field('roles')
+            role_class = relation.related_model
+            parent_field = relation.field.name
+            people = list(Person.objects.all()[:100])
+            role_class.objects.bulk_create([
+                role_class(
+                    person=self.random.choice(people), role=self.words(1), sort_order=i, **{parent_field: parent}
+                )
+                for i in range(count)
+            ])
+
+    def generate(self):
+        root = Page.objects.get(depth=1)
+        home = self.add(root, FrontPage(title='Digitaalinen Helsinki', hero=self.body(1, heading_blocks=False)))
+        Site.objects.update_or_create(is_default_site=True, defaults={
+            'hostname': 'localhost', 'port': 80, 'site_name': 'Synthetic site', 'root_page': home,
+        })
+
+        theme_index = self.add(home, ThemeIndexPage(title='Teemat', show_in_menus=True))
+        theme_count = max(2, self.size // 100)
+        themes = [
+            self.add(theme_index, ThemePage(
+                short_description=self.words(20), body=self.body(2, heading_blocks=False),
+                promote_on_front_page=(i < 4), show_in_menus=True,
+            ))
+            for i in range(theme_count)
+        ]
+        project_count = max(len(themes), int(self.size * THEME_SHARE) - theme_count)
+        projects = [
+            self.add(themes[i % len(themes)], ProjectPage(
+                short_description=self.words(20), body=self.body(2, heading_blocks=False), show_in_menus=(i < 20),
+            ))
+            for i in range(project_count)
+        ]
+
+        guide = self.add(home, GuideFrontPage(title='Ohjeet', show_in_menus=True))
+        guide_pages = self.add_tree(guide, int(self.size * GUIDE_SHARE), 10, lambda top: GuideContentPage(
+            body=self.body(), sidebar=self.body(1),
+        ))
+
+        kehmet = self.add(home, KehmetFrontPage(title='Kehittämismenetelmä', body=self.body(), show_in_menus=True))
+        kehmet_pages = self.add_tree(kehmet, int(self.size * KEHMET_SHARE), 8, lambda top: KehmetContentPage(
+            body=self.body(), show_in_menus=True,
+        ))
+
+        content_pages = self.add_tree(home, int(self.size * CONTENT_SHARE), 8, lambda top: (
+            LinkedContentPage(body=self.body(), show_in_menus=top) if self.random.random() < 0.3
+            else ContentPage(body=self.body(), show_in_menus=top)
+        ))
+
+        person_index = self.add(home, PersonIndexPage(
+            title='Ihmiset', body='<p>{}.</p>'.format(self.words(20).capitalize()), show_in_menus=True,
+        ))
+        news_index = self.add(home, NewsIndexPage(title='Uutiset', show_in_menus=True))
+        events_index = self.add(home, EventsIndexPage(title='Tapahtumat', show_in_menus=True))
+        home.news_index_page = news_index
+        home.save()
+
+        people = self.generate_people(themes, projects, content_pages)
+        self.generate_feedback(themes + projects + guide_pages + kehmet_pages + content_pages)
+
+        return {
+            'home': home,
+            'theme_index': theme_index,
+            'theme': themes[0],
+            'project': projects[0],
+            'guide': guide,
+            'guide_page': guide_pages[-1] if guide_pages else None,
+            'kehmet': kehmet,
+            'kehmet_page': kehmet_pages[-1] if kehmet_pages else None,
+            'content_page': next((page for page in content_pages if type(page) is ContentPage), None),
+            'linked_content_page': next((page for page in content_pages if type(page) is LinkedContentPage), None),
+            'person_index': person_index,
+            'news_index': news_index,
+            'events_index': events_index,
+            'people': people,
+            'page_count': self.page_count,
+        }
+
+    def generate_people(self, themes, projects, content_pages, count=None):
+        if count is None:
+            count = max(10, self.size // 10)
+        # Bulk creation skips the signals, e.g. fetching avatars
+        people = Person.objects.bulk_create([
+            Person(
+                first_name=self.random.choice(FIRST_NAMES), last_name=self.random.choice(LAST_NAMES),
+                email='person{:08x}@example.com'.format(self.random.getrandbits(32)), title=self.words(2),
+            )
+            for i in range(count)
+        ])
+        groups = Group.objects.bulk_create([Group(name=self.title()) for i in range(max(2, len(people) // 20))])
+        Membership.objects.bulk_create([
+            Membership(person=person, group=self.random.choice(groups)) for person in people
+        ])
+        ThemeRole.objects.bulk_create([
+            ThemeRole(theme=theme, person=self.random.choice(people), role=self.words(1), sort_order=i)
+            for theme in themes for i in range(3)
+        ])
+        ProjectRole.objects.bulk_create([
+            ProjectRole(project=project, person=self.random.choice(people), role=self.words(1), sort_order=i)
+            for project in projects for i in range(2)
+        ])
+        LinkedContentPageRole.objects.bulk_create([
+            LinkedContentPageRole(page=page, person=self.random.choice(people), role=self.words(1), sort_order=i)
+            for page in content_pages if isinstance(page, LinkedContentPage) for i in range(2)
+        ])
+        for model in PersonIndexPage.get_directory_models():
+            bump_change_counter(model)
+        return people
+
+    def generate_feedback(self, pages):
+        if not pages:
+            return
+        # Bulk creation skips the statistics, so they are rebuilt afterwards
+        content_types = ContentType.objects.get_for_models(*set(type(page) for page in pages))
+        notified_at = now()
+        feedbacks = []
+        for i in range(self.size):
+            page = self.random.choice(pages)
+            feedbacks.append(Feedback(
+                url='http://localhost{}'.format(page.url_path), body=self.words(20), subject=self.title(),
+                content_type=content_types[type(page)], object_id=page.pk, notified_at=notified_at,
+            ))
+        Feedback.objects.bulk_create(feedbacks, batch_size=1000)
+        rebuild_stats()
+
+
+def clear_site():
+    """
+    Delete all pages, people and feedback.
+    """
+    Page.objects.get(depth=1).get_children().delete()
+    Person.objects.all().delete()
+    Group.objects.all().delete()
+    Feedback.objects.all().delete()
+    rebuild_stats()
+
+
+def generate_site(size, seed=0):
+    """
+    Generate a synthetic site of about `size` pages, replacing the current pages, people and feedback.
+
+    :param size: Approximate number of pages to generate
+    :type size: int
+    :param seed: Seed for the random titles and structure
+    :type seed: int
+    :return: The generated pages of each type, the people and the number of pages
+    :rtype: dict
+    """
+    clear_site()
+    return SiteGenerator(size, seed).generate()
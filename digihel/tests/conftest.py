@@ -1,9 +1,19 @@
 # -*- coding: utf-8 -*-
+import threading
+
 import pytest
 from blog.models import BlogIndexPage
+from django.core.cache import cache
 from wagtail.core.models import Page, Site
 
 from digi.models import FrontPage
+from digihel.fake_upstream import FakeUpstreamConfig, make_server
+
+
+@pytest.fixture(scope='session', autouse=True)
+def clear_shared_cache():
+    # The cache is shared, so it holds entries of earlier test runs
+    cache.clear()
 
 
 def root_page():
@@ -29,3 +39,15 @@ def index_pages():
     blog_index = home.add_child(instance=BlogIndexPage(title='Test Blog Index', live=True))
 
     return [home, blog_index]
+
+
+@pytest.fixture
+def fake_upstream(settings):
+    config = FakeUpstreamConfig()
+    server = make_server('127.0.0.1', 0, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    settings.NEWS_FEED_URL = base_url + 'news/feed.xml'
+    yield base_url, config
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+from django.core.files.storage import default_storage
+
+from digihel.fake_upstream import make_png
+from people import signals
+from people.avatars import AVATAR_SIZES, get_avatar_path, store_avatar
+from people.models import Person
+from people.tasks import fetch_person_avatar
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def queued_fetches(monkeypatch):
+    queued = []
+    monkeypatch.setattr(signals.transaction, 'on_commit', lambda func: func())
+    monkeypatch.setattr(fetch_person_avatar, 'delay', queued.append)
+    return queued
+
+
+@pytest.mark.django_db
+def test_fetch_person_avatar(fake_upstream, settings, media_root, queued_fetches):
+    base_url, config = fake_upstream
+    settings.AVATAR_API_URL = base_url + 'avatar/'
+    person = Person.objects.create(first_name='Matti', last_name='Meikäläinen', email='matti@example.com')
+
+    fetch_person_avatar(person.pk)
+    person.refresh_from_db()
+    assert person.avatar_hash
+    for size in AVATAR_SIZES:
+        assert default_storage.exists(get_avatar_path(person.avatar_hash, size))
+    assert person.get_avatar_url(80) == '/avatars/{}/80.png'.format(person.avatar_hash)
+
+
+@pytest.mark.django_db
+def test_avatar_is_fetched_when_email_changes(queued_fetches):
+    person = Person.objects.create(first_name='Matti', last_name='Meikäläinen', email='matti@example.com')
+    assert queued_fetches == [person.pk]
+    Person.objects.filter(pk=person.pk).update(avatar_hash='a' * 40)
+
+    person = Person.objects.get(pk=person.pk)
+    person.telephone = '09 123'
+    person.save()
+    assert queued_fetches == [person.pk]
+
+    person.email = 'matti.meikalainen@example.com'
+    person.save()
+    assert queued_fetches == [person.pk, person.pk]
+    person.save()
+    assert queued_fetches == [person.pk, person.pk]
+
+
+def test_store_avatar_keeps_one_copy_when_raced(media_root, monkeypatch):
+    image = make_png(300, (10, 20, 30))
+    avatar_hash = store_avatar(image)
+    # This process checked for the files before another one stored them
+    exists = default_storage.exists
+    checked = set()
+
+    def exists_after_check(name):
+        if name in checked:
+            return exists(name)
+        checked.add(name)
+        return False
+
+    monkeypatch.setattr(default_storage, 'exists', exists_after_check)
+    assert store_avatar(image) == avatar_hash
+    assert sorted(os.listdir(os.path.join(str(media_root), 'avatars', avatar_hash))) == sorted(
+        '{}.png'.format(size) for size in AVATAR_SIZES
+    )
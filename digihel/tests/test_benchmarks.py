@@ -0,0 +1,86 @@
+"""
+Rendering benchmarks over synthetic sites of different sizes.
+
+These are slow, so they only run with `BENCHMARK=1`. The sizes are given in
+`BENCHMARK_SIZES` (default `1000`, e.g. `1000,10000,50000`). Each page is rendered
+with an empty cache, and the median time is compared to `benchmark_baseline.json`;
+a benchmark fails if it is more than `BENCHMARK_TOLERANCE` (default 1.5) times slower.
+Run with `BENCHMARK_SAVE=1` to write the current times as the new baseline.
+"""
+import json
+import os
+import statistics
+import time
+
+import pytest
+from django.core.cache import cache
+
+from digihel.synthetic import clear_site, generate_site
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+SIZES = [int(size) for size in os.environ.get('BENCHMARK_SIZES', '1000').split(',')]
+ROUNDS = 5
+
+pytestmark = pytest.mark.skipif(os.environ.get('BENCHMARK') != '1', reason='Set BENCHMARK=1 to run benchmarks')
+
+results = {}
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@pytest.fixture(scope='module', params=SIZES)
+def synthetic_site(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        site = generate_site(request.param)
+        site['size'] = request.param
+        yield site
+        clear_site()
+
+
+@pytest.fixture(scope='module', autouse=True)
+def save_baseline():
+    yield
+    if os.environ.get('BENCHMARK_SAVE') == '1' and results:
+        baseline = load_baseline()
+        baseline.update(results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def get_url(site, name):
+    return {
+        'front_page': '/',
+        'guide_sidebar': site['guide_page'].url,
+        'sitemap': '/sivukartta/',
+        'search': '/search/?query=helsinki',
+        'people_index': site['person_index'].url,
+    }[name]
+
+
+@pytest.mark.parametrize('name', ['front_page', 'guide_sidebar', 'sitemap', 'search', 'people_index'])
+def test_render(client, django_db_blocker, synthetic_site, name):
+    url = get_url(synthetic_site, name)
+    times = []
+    with django_db_blocker.unblock():
+        for i in range(ROUNDS):
+            cache.clear()
+            started_at = time.perf_counter()
+            response = client.get(url)
+            times.append(time.perf_counter() - started_at)
+            assert response.status_code == 200
+    median_ms = statistics.median(times) * 1000
+    key = '{}@{}'.format(name, synthetic_site['size'])
+    results[key] = round(median_ms, 1)
+
+    baseline_ms = load_baseline().get(key)
+    tolerance = float(os.environ.get('BENCHMARK_TOLERANCE', '1.5'))
+    if baseline_ms and os.environ.get('BENCHMARK_SAVE') != '1':
+        assert median_ms <= baseline_ms * tolerance, '{} took {:.1f} ms, baseline {:.1f} ms'.format(
+            key, median_ms, baseline_ms,
+        )
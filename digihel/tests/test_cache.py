@@ -0,0 +1,68 @@
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from digihel.cache import TieredCache
+
+
+@pytest.fixture(autouse=True)
+def l1_stores(monkeypatch):
+    # The in-process tiers are shared by location, so give each test empty ones
+    monkeypatch.setattr('digihel.cache._l1_stores', {})
+
+
+def make_tiered_caches(monkeypatch):
+    shared = LocMemCache('tiered-test', {})
+    shared.clear()
+    monkeypatch.setattr(TieredCache, 'l2', shared, raising=False)
+    # Two processes: separate in-process tiers over the same shared cache
+    return shared, (
+        TieredCache('tiered-test-1', {'OPTIONS': {'VERSION_CHECK_INTERVAL': 0}}),
+        TieredCache('tiered-test-2', {'OPTIONS': {'VERSION_CHECK_INTERVAL': 0}}),
+    )
+
+
+def test_tiered_cache_keeps_hot_keys_in_process(monkeypatch):
+    shared, (first, second) = make_tiered_caches(monkeypatch)
+    first.set('news_cache_key', ['news'])
+    assert second.get('news_cache_key') == ['news']
+    assert second._store.entries[('news_cache_key', None)][1] == ['news']
+
+    # Served from the in-process tier while the shared version is unchanged
+    shared.set('news_cache_key', ['changed behind our back'])
+    assert second.get('news_cache_key') == ['news']
+
+    # A write through another process drops the in-process entries
+    first.set('news_cache_key', ['newer news'])
+    assert second.get('news_cache_key') == ['newer news']
+    assert second._store.entries[('news_cache_key', None)][1] == ['newer news']
+
+
+def test_tiered_cache_passes_other_keys_through(monkeypatch):
+    shared, (first, second) = make_tiered_caches(monkeypatch)
+    first.set('search_generation', 1)
+    first.incr('search_generation')
+    assert second.get('search_generation') == 2
+    assert not first._store.entries
+    assert not second._store.entries
+    assert second.get_many(['search_generation', 'missing']) == {'search_generation': 2}
+
+
+def test_tiered_cache_keeps_template_fragments_shared(monkeypatch):
+    shared, (first, second) = make_tiered_caches(monkeypatch)
+    first.set('news_cache_key', ['news'])
+    assert second.get('news_cache_key') == ['news']
+    first.set('template.cache.content_block.abc', '<p>Lohko</p>')
+    assert not first._store.entries.get(('template.cache.content_block.abc', None))
+    # Filling a fragment does not drop the in-process entries of other processes
+    assert ('news_cache_key', None) in second._store.entries
+    second.get('news_cache_key')
+    assert ('news_cache_key', None) in second._store.entries
+
+
+def test_tiered_cache_clear_drops_entries_of_all_processes(monkeypatch):
+    shared, (first, second) = make_tiered_caches(monkeypatch)
+    first.set('news_cache_key', ['news'])
+    assert second.get('news_cache_key') == ['news']
+    first.clear()
+    shared.set('news_cache_key', ['refetched news'])
+    assert second.get('news_cache_key') == ['refetched news']
@@ -0,0 +1,14 @@
+from digi.excerpts import extract_excerpt
+from digi.templatetags.digi_tags import first_p
+
+
+def test_first_p_returns_first_paragraph():
+    html = '<h2>Otsikko</h2><p class="intro">Eka <b>kappale</b></p><p>Toka kappale</p>'
+    assert first_p(html) == '<p>Eka <b>kappale</b></p>'
+    assert first_p('<div>Ei kappaleita</div>') == ''
+    assert first_p(None) == ''
+
+
+def test_extract_excerpt_falls_back_to_text():
+    assert extract_excerpt('<div>Ei  kappaleita</div>') == '<p>Ei kappaleita</p>'
+    assert extract_excerpt('<div>' + 'a' * 500 + '</div>', max_length=10) == '<p>aaaaaaaaa…</p>'
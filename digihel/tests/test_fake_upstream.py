@@ -0,0 +1,18 @@
+import requests
+
+from news.news import get_news
+
+
+def test_fake_upstream_scales_news_feed(fake_upstream):
+    base_url, config = fake_upstream
+    config.items = 25
+    news = get_news('/uutiset/')
+    assert len(news) == 25
+    assert len(set(item.slug for item in news)) == 25
+
+
+def test_fake_upstream_fails_at_error_rate(fake_upstream):
+    base_url, config = fake_upstream
+    config.error_rate = 1
+    assert requests.get(base_url + 'linkedevents/v1/event/').status_code == 503
+    assert requests.post(base_url + 'slack/webhook', json={'text': 'Hello'}).status_code == 429
@@ -0,0 +1,82 @@
+import time
+from email.utils import formatdate
+
+import pytest
+from django.core.cache import cache
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from feedback.export import iter_csv
+from feedback.models import Feedback, FeedbackDelivery, SlackNotifier, parse_retry_after
+from feedback.tasks import deliver_pending, send_feedback_digest
+from feedback.throttling import FeedbackIPThrottle, FeedbackURLThrottle
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('30') == 30
+    assert parse_retry_after(None) == 1
+    assert parse_retry_after('soon') == 1
+    assert 55 <= parse_retry_after(formatdate(timeval=time.time() + 60, usegmt=True)) <= 60
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('status_code, attempts, retry_after', [(503, 1, 60), (404, 5, None)])
+def test_deliver_pending_failure(monkeypatch, status_code, attempts, retry_after):
+    cache.clear()
+    notifier = SlackNotifier.objects.create(
+        type='slack', url_base='https://digi.hel.fi', language='fi', webhook_url='https://hooks.example.com/x',
+    )
+    feedback = Feedback.objects.create(url='https://digi.hel.fi/', body='Palautetta')
+    FeedbackDelivery.objects.create(feedback=feedback, notifier=notifier)
+    monkeypatch.setattr('feedback.models.requests.post', lambda *args, **kwargs: FakeResponse(status_code))
+    assert deliver_pending(20) == (retry_after, False)
+    delivery = FeedbackDelivery.objects.get()
+    assert delivery.delivered_at is None
+    assert delivery.attempts == attempts
+    assert str(status_code) in delivery.error
+
+
+@pytest.mark.django_db
+def test_send_feedback_digest_backlog(monkeypatch, settings):
+    cache.clear()
+    settings.FEEDBACK_DIGEST_MAX_ITEMS = 2
+    SlackNotifier.objects.create(
+        type='slack', url_base='https://digi.hel.fi', language='fi', webhook_url='https://hooks.example.com/x',
+    )
+    for i in range(3):
+        Feedback.objects.create(url='https://digi.hel.fi/', body='Palautetta {}'.format(i))
+    monkeypatch.setattr('feedback.models.requests.post', lambda *args, **kwargs: FakeResponse(200))
+    queued = []
+    monkeypatch.setattr(send_feedback_digest, 'apply_async', lambda **kwargs: queued.append(kwargs))
+    monkeypatch.setattr(send_feedback_digest, 'retry', lambda **kwargs: pytest.fail('Retried a full batch'))
+    send_feedback_digest()
+    assert queued == [{'countdown': 1}]
+    assert FeedbackDelivery.objects.filter(delivered_at__isnull=False).count() == 2
+
+
+@pytest.mark.parametrize('data', [['https://digi.hel.fi/'], 'https://digi.hel.fi/', {'url': ['x']}])
+def test_url_throttle_ignores_bodies_without_url(data):
+    request = Request(APIRequestFactory().post('/palaute/', data, format='json'), parsers=[JSONParser()])
+    throttle = FeedbackURLThrottle()
+    assert throttle.get_ident_for_request(request) is None
+    assert throttle.allow_request(request, None)
+
+
+def test_throttles_have_concrete_identities():
+    request = Request(APIRequestFactory().post('/palaute/', {'url': 'https://digi.hel.fi/'}, format='json'),
+                      parsers=[JSONParser()])
+    assert FeedbackURLThrottle().get_ident_for_request(request) == 'https://digi.hel.fi/'
+    assert FeedbackIPThrottle().get_ident_for_request(request) == '127.0.0.1'
+
+
+def test_csv_export_escapes_formulas():
+    rows = [[1, '=HYPERLINK("http://example.com")', '+358 40 123', '-1', '@SUM(A1)', 'Tavallinen', None]]
+    lines = list(iter_csv(rows))
+    assert lines[1] == '1,"\'=HYPERLINK(""http://example.com"")",\'+358 40 123,\'-1,\'@SUM(A1),Tavallinen,\r\n'
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from wagtail.core.models import Site
+
+from content.fragments import get_fragment_key_prefix, get_linking_page_ids
+from content.models import ContentPage
+
+
+def add_content_page(parent, title, text):
+    page = parent.add_child(instance=ContentPage(
+        title=title, live=True, body=json.dumps([{'type': 'paragraph', 'value': text}]),
+    ))
+    page.save_revision().publish()
+    return ContentPage.objects.get(pk=page.pk)
+
+
+@pytest.mark.django_db
+def test_fragments_are_invalidated_when_linked_url_changes(client, home_page):
+    # Pages of sites named "test" have no URLs
+    Site.objects.update(site_name='Fragments')
+    cache.clear()
+    target = add_content_page(home_page, 'Kohde', '<p>Kohde</p>')
+    link = '<p><a id="{}" linktype="page">Kohteeseen</a></p>'.format(target.pk)
+    linking = add_content_page(home_page, 'Linkittävä', link)
+    other = add_content_page(home_page, 'Muu', '<p>Ei linkkejä</p>')
+    assert get_linking_page_ids([target.pk]) == {linking.pk}
+
+    assert 'href="/kohde/"' in client.get(linking.url).content.decode('utf8')
+    linking_prefix = get_fragment_key_prefix(linking)
+    other_prefix = get_fragment_key_prefix(other)
+
+    target.slug = 'uusi-kohde'
+    target.save_revision().publish()
+    assert get_fragment_key_prefix(linking) != linking_prefix
+    assert get_fragment_key_prefix(other) == other_prefix
+    assert 'href="/uusi-kohde/"' in client.get(linking.url).content.decode('utf8')
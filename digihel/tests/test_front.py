@@ -1,5 +1,9 @@
+import json
+
 import pytest
 
+from content.models import ContentPage
+
 
 @pytest.mark.django_db
 def test_front_page(client, home_page):
@@ -7,3 +11,13 @@ def test_front_page(client, home_page):
     assert response.status_code == 200
     print(response.content)
     assert 'Helsingin kaupunki' in str(response.content)
+
+
+@pytest.mark.django_db
+def test_content_page(client, home_page):
+    page = home_page.add_child(instance=ContentPage(
+        title='Sisältösivu', live=True, body=json.dumps([{'type': 'paragraph', 'value': '<p>Sisältöä</p>'}]),
+    ))
+    response = client.get('/{}/'.format(page.slug))
+    assert response.status_code == 200
+    assert 'Sisältöä' in response.content.decode('utf8')
@@ -0,0 +1,17 @@
+import pytest
+
+from users.models import User
+
+
+@pytest.mark.django_db
+def test_cache_metrics_require_token_or_superuser(client, settings):
+    settings.METRICS_TOKEN = 'sekret'
+    assert client.get('/metrics/cache/').status_code == 403
+    assert client.get('/metrics/cache/', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code == 403
+    assert client.get('/metrics/cache/', HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+    assert client.get('/metrics/cache/', HTTP_AUTHORIZATION='Bearer sekret').status_code == 200
+
+    settings.METRICS_TOKEN = None
+    assert client.get('/metrics/cache/', HTTP_AUTHORIZATION='Bearer ').status_code == 403
+    client.force_login(User.objects.create(username='admin', is_superuser=True))
+    assert client.get('/metrics/cache/').status_code == 200
@@ -0,0 +1,43 @@
+import pytest
+from django.core.cache import cache
+
+from people.api import etag_matches
+from people.cache import get_change_counter_key
+from people.models import Person
+from users.models import User
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"abc"', '"xyz", W/"abc"')
+    assert etag_matches('"abc"', '*')
+    assert not etag_matches('"abc"', '"abcd"')
+    assert not etag_matches('"abc"', '"xabc", "ab"')
+    assert not etag_matches('"abc"', '')
+
+
+@pytest.mark.django_db
+def test_people_api(client):
+    Person.objects.create(first_name='Matti', last_name='Meikäläinen', email='matti@example.com')
+    assert client.get('/api/people/').status_code == 403
+    client.force_login(User.objects.create(username='tester'))
+    response = client.get('/api/people/')
+    assert response.status_code == 200
+    assert response.json()['results'][0]['email'] == 'matti@example.com'
+    assert client.get('/api/people/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+    assert client.get('/api/people/?group=1').status_code == 200
+    response = client.get('/api/people/?group=x&theme=1')
+    assert response.status_code == 400
+    assert list(response.json()) == ['group']
+
+
+@pytest.mark.django_db
+def test_people_api_etag_changes_when_counter_is_lost(client):
+    client.force_login(User.objects.create(username='tester'))
+    etag = client.get('/api/people/')['ETag']
+    Person.objects.create(first_name='Matti', last_name='Meikäläinen')
+    # E.g. evicted, or the cache restarted
+    cache.delete(get_change_counter_key(Person))
+    response = client.get('/api/people/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
@@ -0,0 +1,88 @@
+"""
+Query count budgets for rendering each page type.
+
+Each page type is rendered with an empty cache on a synthetic site, once with
+10 and once with 1000 children (or people, or news items) under the rendered
+page. The budget must hold at both sizes, so a query per child fails the test.
+"""
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from feedparser import FeedParserDict
+
+from digihel.fake_upstream import load_fixture
+from digihel.synthetic import SiteGenerator, clear_site, generate_site
+
+SIZES = [10, 1000]
+
+# Page type -> (synthetic site key, maximum number of queries); the measured count and two more
+BUDGETS = {
+    'FrontPage': ('home', 25),
+    'ThemePage': ('theme', 24),
+    'ProjectPage': ('project', 27),
+    'ContentPage': ('content_page', 18),
+    'LinkedContentPage': ('linked_content_page', 20),
+    'GuideContentPage': ('guide_page', 37),
+    'KehmetContentPage': ('kehmet_page', 40),
+    'PersonIndexPage': ('person_index', 22),
+    'NewsIndexPage': ('news_index', 18),
+    'EventsIndexPage': ('events_index', 18),
+}
+
+
+@pytest.fixture(scope='module', params=SIZES)
+def synthetic_site(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        site = generate_site(100)
+        generator = SiteGenerator(100, seed=1)
+        for key, budget in BUDGETS.values():
+            generator.add_children(site[key], request.param)
+        site['size'] = request.param
+        yield site
+        clear_site()
+
+
+@pytest.fixture(autouse=True)
+def news_feed(monkeypatch, synthetic_site):
+    entries = [
+        FeedParserDict(
+            title='Uutinen {}'.format(i), link='https://example.com/uutiset/uutinen-{}'.format(i),
+            description='<p>Uutisen {} teksti.</p>'.format(i), published='Mon, 01 Oct 2018 12:00:00 +0300',
+        )
+        for i in range(synthetic_site['size'])
+    ]
+    monkeypatch.setattr('news.news.get_news_feeds', lambda: entries)
+
+
+@pytest.fixture(autouse=True)
+def events_api(monkeypatch):
+    # Events come from the recorded responses of the fake upstream instead of the real services
+    events = json.loads(load_fixture('linkedevents_events.json'))
+    monkeypatch.setattr('events.models.fetch_json', lambda url: events)
+
+
+def record_queries(queries):
+    # Unlike CaptureQueriesContext, not limited by the size of the query log
+    def execute(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+    return execute
+
+
+@pytest.mark.parametrize('page_type', sorted(BUDGETS))
+def test_query_budget(client, django_db_blocker, synthetic_site, page_type):
+    key, budget = BUDGETS[page_type]
+    page = synthetic_site[key]
+    assert page.specific_class.__name__ == page_type
+    url = page.url
+    queries = []
+    with django_db_blocker.unblock():
+        cache.clear()
+        with connection.execute_wrapper(record_queries(queries)):
+            response = client.get(url)
+    assert response.status_code == 200
+    assert len(queries) <= budget, '{} with {} children took {} queries, budget {}:\n{}'.format(
+        page_type, synthetic_site['size'], len(queries), budget, '\n'.join(queries),
+    )
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from content.models import ContentPage
+from digi.models import FrontPage
+from search import queue
+from search.management.commands.reindex_parallel import Command as ReindexCommand
+from search.cache import CachedSearchResults, normalize_query
+from search.models import IndexQueueEntry
+from search.suggest import SuggestionIndex
+from search.text import get_search_text, html_to_text, prefetch_search_text
+
+
+def test_normalize_query():
+    assert normalize_query('  Digitaalinen\tHELSINKI \n') == 'digitaalinen helsinki'
+
+
+@pytest.mark.django_db
+def test_cached_search_results_indexing(home_page):
+    results = CachedSearchResults('helsinki')
+    results._page_ids = [home_page.pk]
+    results._count = 1
+    assert results[-1].pk == home_page.pk
+    assert [page.pk for page in results[-1:]] == [home_page.pk]
+    with pytest.raises(IndexError):
+        results[1]
+    with pytest.raises(ValueError):
+        results[::2]
+
+
+@pytest.mark.django_db
+def test_cached_search_results_past_cached_ids(home_page, settings):
+    settings.SEARCH_RESULT_CACHE_SIZE = 2
+    cache.clear()
+    for number in range(5):
+        home_page.add_child(instance=ContentPage(title='Helsinki {}'.format(number), live=True))
+
+    results = CachedSearchResults('helsinki')
+    assert len(results.page_ids) == 2
+    assert results.count() == 5
+
+    paginator = Paginator(results, 2)
+    assert paginator.num_pages == 3
+    titles = [page.title for number in paginator.page_range for page in paginator.page(number)]
+    assert sorted(titles) == ['Helsinki {}'.format(number) for number in range(5)]
+    assert isinstance(results[4], ContentPage)
+
+    # The count is cached with the ids
+    assert CachedSearchResults('HELSINKI ').count() == 5
+
+
+class FlakyBackend(object):
+    def __init__(self):
+        self.fail = True
+        self.added = []
+
+    def add_bulk(self, model, objects):
+        if self.fail:
+            raise ConnectionError('search backend unavailable')
+        self.added.extend(obj.pk for obj in objects)
+
+    def delete(self, obj):
+        pass
+
+
+@pytest.mark.django_db
+def test_flush_queue_keeps_entries_on_backend_error(home_page, monkeypatch):
+    backend = FlakyBackend()
+    monkeypatch.setattr(queue, 'get_queued_backend_names', lambda: ['default'])
+    monkeypatch.setattr(queue, 'get_search_backend', lambda name: backend)
+    IndexQueueEntry.objects.create(content_type=ContentType.objects.get_for_model(FrontPage), object_id=home_page.pk)
+
+    with pytest.raises(ConnectionError):
+        queue.flush_queue()
+    assert IndexQueueEntry.objects.filter(object_id=home_page.pk).exists()
+
+    backend.fail = False
+    assert queue.flush_queue() == 1
+    assert backend.added == [home_page.pk]
+    assert not IndexQueueEntry.objects.exists()
+
+
+def test_suggestion_lookup():
+    index = SuggestionIndex()
+    index._set_page_title(1, 'Digitaalinen Helsinki')
+    index._set_page_title(2, 'Helsingin kaupunki')
+    index._add_term('digituki', 10)
+
+    assert index.lookup('HEL') == ['Helsingin kaupunki', 'Digitaalinen Helsinki']
+    assert index.lookup('digi') == ['digituki', 'Digitaalinen Helsinki']
+    assert index.lookup('xyz') == []
+
+    index._set_page_title(1, None)
+    assert index.lookup('hel') == ['Helsingin kaupunki']
+
+
+def test_suggestion_lookup_ranks_all_matches():
+    index = SuggestionIndex()
+    for number in range(1000):
+        index._set_page_title(number, 'Aalto {:04d}'.format(number))
+    index._add_term('asukaspuisto', 100)
+
+    assert index.lookup('a', limit=1) == ['asukaspuisto']
+    index._add_term('avoin data', 200)
+    assert index.lookup('a', limit=1) == ['avoin data']
+
+
+def test_suggestion_index_rebuilds_in_background():
+    index = SuggestionIndex()
+    index._set_page_title(1, 'Digitaalinen Helsinki')
+    index.built_at = index.checked_at = time.time() - 7200
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        started.set()
+        release.wait(5)
+        index.built_at = time.time()
+
+    index.build = build
+    index.ensure_fresh()
+    assert started.wait(5)
+    # The old index is served while the rebuild runs, and no second rebuild is started
+    assert index.lookup('digi') == ['Digitaalinen Helsinki']
+    index.ensure_fresh()
+    release.set()
+    assert index._update_lock.acquire(timeout=5)
+    assert len(builds) == 1
+
+
+def test_html_to_text():
+    assert html_to_text('<p>Hei <b>maailma</b></p><p>Toinen\n kappale</p>') == 'Hei maailma Toinen kappale'
+    assert html_to_text('Pelkkää tekstiä') == 'Pelkkää tekstiä'
+    assert html_to_text('  ') == ''
+
+
+@pytest.mark.django_db
+def test_prefetched_search_text(home_page, django_assert_num_queries):
+    for number in range(3):
+        body = json.dumps([
+            {'type': 'collapsible', 'value': '<p>Sivu {}</p>'.format(number)},
+            {'type': 'two_columns', 'value': {'left_column': [], 'right_column': []}},
+        ])
+        page = home_page.add_child(instance=ContentPage(title='Sivu {}'.format(number), body=body))
+        page.save_revision().publish()
+    draft = ContentPage.objects.get(title='Sivu 0')
+    draft.body = json.dumps([{'type': 'collapsible', 'value': '<p>Luonnos</p>'}])
+    draft.save_revision()
+
+    pages = list(ContentPage.objects.order_by('title'))
+    with django_assert_num_queries(3):
+        prefetch_search_text(pages)
+    with django_assert_num_queries(0):
+        texts = [get_search_text(page, 'body') for page in pages]
+    assert texts == ['Sivu 0', 'Sivu 1', 'Sivu 2']
+
+
+class FakeIndices(object):
+    def __init__(self, calls):
+        self.calls = calls
+
+    def exists_alias(self, name):
+        return False
+
+    def exists(self, name):
+        return True
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, kwargs or args))
+
+
+class FakeElasticsearch(object):
+    def __init__(self, version):
+        self.version = version
+        self.calls = []
+        self.indices = FakeIndices(self.calls)
+
+    def info(self):
+        return {'version': {'number': self.version}}
+
+
+@pytest.mark.parametrize('version, expected', [
+    ('2.4.1', ['delete', 'put_alias']),
+    ('6.4.0', ['update_aliases']),
+])
+def test_reindex_replaces_plain_index_with_alias(version, expected):
+    es = FakeElasticsearch(version)
+    ReindexCommand().switch_alias(es, 'digihel', 'digihel_20260101000000')
+    assert [name for name, arguments in es.calls] == expected
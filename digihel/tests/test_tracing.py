@@ -0,0 +1,121 @@
+import pytest
+import requests
+from celery import shared_task
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory
+from wagtail.core.models import Page
+
+from digihel.tracing import (
+    MemoryExporter, TracingMiddleware, add_trace_headers, begin_trace, build_waterfall, end_trace, span,
+    summarize_trace
+)
+
+
+@pytest.fixture
+def exporter(monkeypatch, settings):
+    settings.TRACING_ENABLED = True
+    exporter = MemoryExporter()
+    monkeypatch.setattr('digihel.tracing._exporter', exporter)
+    return exporter
+
+
+@shared_task
+def traced_task():
+    with span('feedparser.parse', 'http'):
+        pass
+
+
+def test_task_spans_join_request_trace(monkeypatch):
+    exporter = MemoryExporter()
+    monkeypatch.setattr('digihel.tracing._exporter', exporter)
+
+    begin_trace('GET /', 'request')
+    with span('events.linkedevents', 'integration'):
+        with span('GET api.hel.fi/linkedevents/v1/event/', 'http'):
+            pass
+    headers = {}
+    add_trace_headers('people.tasks.fetch_person_avatar', headers=headers)
+    end_trace()
+
+    begin_trace('people.tasks.fetch_person_avatar', 'task', headers['trace_id'], headers['trace_parent_id'])
+    end_trace()
+
+    [spans] = exporter.get_traces()
+    assert summarize_trace(spans)['name'] == 'GET /'
+    assert summarize_trace(spans)['task_count'] == 1
+    rows = build_waterfall(spans)
+    assert [(row['name'], row['depth']) for row in rows] == [
+        ('GET /', 0),
+        ('events.linkedevents', 1),
+        ('GET api.hel.fi/linkedevents/v1/event/', 2),
+        ('people.tasks.fetch_person_avatar', 1),
+    ]
+
+
+def test_span_outside_trace_does_nothing():
+    with span('feedparser.parse', 'http') as current:
+        assert current is None
+
+
+@pytest.mark.django_db
+def test_middleware_records_request_spans(exporter, fake_upstream):
+    base_url, config = fake_upstream
+
+    def view(request):
+        cache.get('news_cache_key')
+        Page.objects.count()
+        # A template tag making a query of its own
+        html = Template('{% load wagtailcore_tags %}{% slugurl "koti" %}').render(Context({'request': request}))
+        requests.get(base_url + 'hri/api/3/action/package_list')
+        return HttpResponse(html)
+
+    response = TracingMiddleware(view)(RequestFactory().get('/sivu/'))
+    assert response.status_code == 200
+
+    [spans] = exporter.get_traces()
+    rows = build_waterfall(spans)
+    assert (rows[0]['name'], rows[0]['kind'], rows[0]['attributes']['status']) == ('GET /sivu/', 'request', 200)
+    kinds = [(row['kind'], row['depth']) for row in rows]
+    assert ('cache', 1) in kinds
+    assert ('db', 1) in kinds
+    assert ('template', 1) in kinds
+    template_row = rows.index(next(row for row in rows if row['kind'] == 'template'))
+    assert rows[template_row]['name'] == 'slugurl'
+    assert (rows[template_row + 1]['kind'], rows[template_row + 1]['depth']) == ('db', 2)
+    [http] = [row for row in rows if row['kind'] == 'http']
+    assert http['name'] == 'GET 127.0.0.1:{}/hri/api/3/action/package_list'.format(base_url.split(':')[-1].strip('/'))
+    assert http['attributes']['status'] == 200
+    assert dict(summarize_trace(spans)['kinds']).keys() == {'db', 'cache', 'http'}
+
+
+def test_middleware_skips_static_and_media_files(exporter, settings):
+    settings.STATIC_URL = '/assets/'
+    settings.MEDIA_URL = '/uploads/'
+    middleware = TracingMiddleware(lambda request: HttpResponse())
+    middleware(RequestFactory().get('/assets/css/site.css'))
+    middleware(RequestFactory().get('/uploads/images/kuva.jpg'))
+    assert exporter.get_traces() == []
+    middleware(RequestFactory().get('/static/'))
+    assert len(exporter.get_traces()) == 1
+
+
+def test_task_trace_begins_from_published_headers(exporter):
+    root = begin_trace('POST /palaute/', 'request')
+    headers = {}
+    add_trace_headers('digihel.tests.test_tracing.traced_task', headers=headers)
+    end_trace()
+    assert headers == {'trace_id': root.trace_id, 'trace_parent_id': root.span_id}
+
+    # Run by a worker: task_prerun begins the trace of the task and task_postrun exports it
+    traced_task.apply(headers=headers)
+
+    [spans] = exporter.get_traces()
+    rows = build_waterfall(spans)
+    assert [(row['name'], row['kind'], row['depth']) for row in rows] == [
+        ('POST /palaute/', 'request', 0),
+        ('digihel.tests.test_tracing.traced_task', 'task', 1),
+        ('feedparser.parse', 'http', 2),
+    ]
+    assert rows[1]['parent_id'] == root.span_id
@@ -0,0 +1,462 @@
+"""
+Lightweight tracing of requests and Celery tasks.
+
+A trace is a tree of timed spans: the request or task at the root, and below it
+database queries, cache calls, template tags, searches and calls to external
+services. The trace id is passed on to the Celery tasks a request queues in the
+message headers, so the spans of the tasks join the trace of the request. Finished
+spans go to the exporter in `TRACING_EXPORTER`, and the Wagtail admin shows each
+trace as a waterfall.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.library import InclusionNode, SimpleNode
+from django.utils.module_loading import import_string
+
+from digihel.profiling import get_file_url_prefixes
+
+CACHE_METHODS = ('get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many', 'incr', 'decr', 'clear')
+# Kinds of spans that are totalled per trace; template tag spans contain the others
+TOTALLED_KINDS = ('db', 'cache', 'search', 'http')
+MAX_FILE_SIZE = 10 * 1024 * 1024
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+_exporter = None
+
+
+def is_enabled():
+    return getattr(settings, 'TRACING_ENABLED', False)
+
+
+class Span(object):
+    def __init__(self, name, kind, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.error = None
+        self.started_at = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': self.started_at,
+            'duration_ms': (self.duration or 0) * 1000,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace(object):
+    """
+    The spans of a trace recorded in this thread, for one request or task.
+    """
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+        self.stack = []
+        self.dropped = 0
+        self.exit_stack = ExitStack()
+
+    @property
+    def current_span(self):
+        return self.stack[-1] if self.stack else None
+
+
+def get_current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def begin_trace(name, kind, trace_id=None, parent_id=None, **attributes):
+    """
+    Start recording a trace in this thread, with a root span for the request or task.
+
+    :param trace_id: Id of the trace to join, e.g. that of the request that queued a task
+    :type trace_id: str|None
+    :param parent_id: Id of the span the root span belongs under
+    :type parent_id: str|None
+    :rtype: Span
+    """
+    trace = _local.trace = Trace(trace_id or uuid.uuid4().hex)
+    root = Span(name, kind, trace.trace_id, parent_id, attributes)
+    trace.spans.append(root)
+    trace.stack.append(root)
+    for connection in connections.all():
+        trace.exit_stack.enter_context(connection.execute_wrapper(trace_query))
+    return root
+
+
+def end_trace():
+    """
+    Finish the trace recorded in this thread and export its spans.
+    """
+    trace = get_current_trace()
+    if trace is None:
+        return
+    _local.trace = None
+    trace.exit_stack.close()
+    for span in trace.stack:
+        span.finish()
+    if trace.dropped:
+        trace.spans[0].attributes['dropped_spans'] = trace.dropped
+    get_exporter().export([span.to_dict() for span in trace.spans])
+
+
+@contextmanager
+def span(name, kind, **attributes):
+    """
+    Record the enclosed block as a span of the current trace; does nothing outside traces.
+
+    :param name: What is done, e.g. the tag name or the requested URL
+    :type name: str
+    :param kind: One of `request`, `task`, `db`, `cache`, `template`, `search`, `http` or `integration`
+    :type kind: str
+    :return: The span, or None if no trace is being recorded
+    """
+    trace = get_current_trace()
+    if trace is None:
+        yield None
+        return
+    if len(trace.spans) >= getattr(settings, 'TRACING_MAX_SPANS', 2000):
+        trace.dropped += 1
+        yield None
+        return
+    parent = trace.current_span
+    current = Span(name, kind, trace.trace_id, parent.span_id if parent else None, attributes)
+    trace.spans.append(current)
+    trace.stack.append(current)
+    try:
+        yield current
+    except Exception as error:
+        current.error = '{}: {}'.format(type(error).__name__, error)[:200]
+        raise
+    finally:
+        current.finish()
+        trace.stack.pop()
+
+
+def set_traced_page(page):
+    trace = get_current_trace()
+    if trace is not None and trace.spans:
+        trace.spans[0].attributes['page_type'] = page.specific_class.__name__
+
+
+def trace_query(execute, sql, params, many, context):
+    with span('db', 'db', sql=sql[:500], alias=context['connection'].alias):
+        return execute(sql, params, many, context)
+
+
+def trace_node_class(node_class, get_name):
+    original_render = node_class.render
+    if getattr(original_render, 'traced', False):
+        return
+
+    @functools.wraps(original_render)
+    def render(self, context):
+        if get_current_trace() is None:
+            return original_render(self, context)
+        with span(get_name(self), 'template'):
+            return original_render(self, context)
+
+    render.traced = True
+    node_class.render = render
+
+
+def trace_cache_method(backend_class, method_name):
+    original = getattr(backend_class, method_name)
+    if getattr(original, 'traced', False):
+        return
+
+    @functools.wraps(original)
+    def method(self, *args, **kwargs):
+        trace = get_current_trace()
+        # Caches wrapping other caches are recorded only once
+        if trace is None or (trace.current_span and trace.current_span.kind == 'cache'):
+            return original(self, *args, **kwargs)
+        key = args[0] if args and isinstance(args[0], str) else None
+        with span('cache.{}'.format(method_name), 'cache', key=key and key[:200]):
+            return original(self, *args, **kwargs)
+
+    method.traced = True
+    setattr(backend_class, method_name, method)
+
+
+def trace_search_results(results_class):
+    original_results = results_class.results
+    original_count = results_class.count
+    if getattr(original_results, 'traced', False):
+        return
+
+    @functools.wraps(original_results)
+    def results(self):
+        if self._results_cache is not None:
+            return original_results(self)
+        with span('search', 'search', backend=type(self.backend).__name__):
+            return original_results(self)
+
+    @functools.wraps(original_count)
+    def count(self):
+        if self._count_cache is not None or self._results_cache is not None:
+            return original_count(self)
+        with span('search.count', 'search', backend=type(self.backend).__name__):
+            return original_count(self)
+
+    results.traced = count.traced = True
+    results_class.results = results
+    results_class.count = count
+
+
+def trace_requests():
+    original_send = requests.Session.send
+    if getattr(original_send, 'traced', False):
+        return
+
+    @functools.wraps(original_send)
+    def send(self, request, **kwargs):
+        # Leave out the query string, which may contain access tokens
+        url = urlsplit(request.url)
+        with span('{} {}{}'.format(request.method, url.netloc, url.path), 'http') as current:
+            response = original_send(self, request, **kwargs)
+            if current is not None:
+                current.attributes['status'] = response.status_code
+            return response
+
+    send.traced = True
+    requests.Session.send = send
+
+
+def install():
+    """
+    Record spans for template tags, cache calls, searches and outbound HTTP calls.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        _installed = True
+    from content.templatetags.content_tags import TableOfContentsNode
+    from wagtail.search.backends.base import BaseSearchResults
+
+    trace_node_class(SimpleNode, lambda node: node.func.__name__)
+    trace_node_class(InclusionNode, lambda node: node.func.__name__)
+    trace_node_class(TableOfContentsNode, lambda node: 'do_table_of_contents')
+    for alias in settings.CACHES:
+        for method_name in CACHE_METHODS:
+            trace_cache_method(type(caches[alias]), method_name)
+    trace_search_results(BaseSearchResults)
+    trace_requests()
+
+
+class MemoryExporter(object):
+    """
+    Keep the spans of the latest `TRACING_KEEP_TRACES` traces in this process.
+    """
+
+    def __init__(self):
+        self.traces = OrderedDict()
+        self.lock = threading.Lock()
+
+    def export(self, spans):
+        keep = getattr(settings, 'TRACING_KEEP_TRACES', 100)
+        with self.lock:
+            trace_spans = self.traces.setdefault(spans[0]['trace_id'], [])
+            trace_spans.extend(spans)
+            self.traces.move_to_end(spans[0]['trace_id'])
+            while len(self.traces) > keep:
+                self.traces.popitem(last=False)
+
+    def get_traces(self):
+        with self.lock:
+            return [list(spans) for spans in reversed(self.traces.values())]
+
+
+class FileExporter(object):
+    """
+    Append spans to `TRACING_FILE` as JSON lines, shared by all processes including Celery workers.
+
+    When the file grows over 10 MB, it is moved aside to `TRACING_FILE` + `.1`.
+    """
+
+    def __init__(self):
+        self.path = settings.TRACING_FILE
+        self.lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span, default=str) + '\n' for span in spans)
+        with self.lock:
+            try:
+                if os.path.getsize(self.path) > MAX_FILE_SIZE:
+                    os.replace(self.path, self.path + '.1')
+            except OSError:
+                pass
+            with open(self.path, 'a', encoding='utf8') as f:
+                f.write(lines)
+
+    def get_traces(self):
+        traces = OrderedDict()
+        try:
+            with open(self.path, encoding='utf8') as f:
+                for line in f:
+                    try:
+                        span = json.loads(line)
+                    except ValueError:  # Partially written
+                        continue
+                    traces.setdefault(span['trace_id'], []).append(span)
+                    traces.move_to_end(span['trace_id'])
+        except FileNotFoundError:
+            return []
+        keep = getattr(settings, 'TRACING_KEEP_TRACES', 100)
+        return list(reversed(traces.values()))[:keep]
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        _exporter = import_string(getattr(settings, 'TRACING_EXPORTER', 'digihel.tracing.MemoryExporter'))()
+    return _exporter
+
+
+def summarize_trace(spans):
+    """
+    Summarize a trace for listing: its root span, duration and the time spent per kind of span.
+
+    :param spans: Spans of the trace
+    :type spans: list[dict]
+    :rtype: dict
+    """
+    span_ids = set(span['span_id'] for span in spans)
+    roots = [span for span in spans if span['parent_id'] not in span_ids]
+    root = min(roots, key=lambda span: span['start'])
+    started_at = min(span['start'] for span in spans)
+    ended_at = max(span['start'] + span['duration_ms'] / 1000 for span in spans)
+    kind_ms = defaultdict(float)
+    for span in spans:
+        if span['kind'] in TOTALLED_KINDS:
+            kind_ms[span['kind']] += span['duration_ms']
+    return {
+        'trace_id': root['trace_id'],
+        'name': root['name'],
+        'page_type': root['attributes'].get('page_type'),
+        'start': started_at,
+        'duration_ms': (ended_at - started_at) * 1000,
+        'span_count': len(spans),
+        'task_count': sum(1 for span in spans if span['kind'] == 'task'),
+        'kinds': [(kind, kind_ms[kind]) for kind in TOTALLED_KINDS if kind in kind_ms],
+    }
+
+
+def build_waterfall(spans):
+    """
+    Order the spans of a trace depth first under their parents, with their offsets
+    and widths as percentages of the whole trace.
+
+    :param spans: Spans of the trace
+    :type spans: list[dict]
+    :rtype: list[dict]
+    """
+    started_at = min(span['start'] for span in spans)
+    total_ms = max(max(span['start'] + span['duration_ms'] / 1000 for span in spans) - started_at, 0.000001) * 1000
+    span_ids = set(span['span_id'] for span in spans)
+    children = defaultdict(list)
+    roots = []
+    for span in sorted(spans, key=lambda span: span['start']):
+        if span['parent_id'] in span_ids:
+            children[span['parent_id']].append(span)
+        else:
+            roots.append(span)
+    rows = []
+    pending = [(root, 0) for root in reversed(roots)]
+    while pending:
+        span, depth = pending.pop()
+        offset_ms = (span['start'] - started_at) * 1000
+        rows.append(dict(
+            span, depth=depth, offset_ms=offset_ms,
+            offset_percent=offset_ms * 100 / total_ms,
+            width_percent=max(span['duration_ms'] * 100 / total_ms, 0.1),
+        ))
+        pending.extend((child, depth + 1) for child in reversed(children[span['span_id']]))
+    return rows
+
+
+class TracingMiddleware(object):
+    """
+    Record a trace of each request.
+
+    Only enabled when `TRACING_ENABLED` is set.
+    """
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.untraced_prefixes = get_file_url_prefixes()
+        install()
+
+    def __call__(self, request):
+        if self.untraced_prefixes and request.path.startswith(self.untraced_prefixes):
+            return self.get_response(request)
+        root = begin_trace('{} {}'.format(request.method, request.path), 'request')
+        try:
+            response = self.get_response(request)
+            root.attributes['status'] = response.status_code
+            return response
+        finally:
+            end_trace()
+
+
+@before_task_publish.connect
+def add_trace_headers(sender=None, headers=None, **kwargs):
+    trace = get_current_trace()
+    if trace is None or headers is None:
+        return
+    headers['trace_id'] = trace.trace_id
+    headers['trace_parent_id'] = trace.current_span.span_id if trace.current_span else None
+
+
+@task_prerun.connect
+def begin_task_trace(task_id=None, task=None, **kwargs):
+    # Tasks run eagerly within a request are part of its trace already
+    if not is_enabled() or get_current_trace() is not None:
+        return
+    install()
+    headers = getattr(task.request, 'headers', None) or {}
+    trace_id = getattr(task.request, 'trace_id', None) or headers.get('trace_id')
+    parent_id = getattr(task.request, 'trace_parent_id', None) or headers.get('trace_parent_id')
+    begin_trace(task.name, 'task', trace_id, parent_id, task_id=task_id)
+    _local.task_id = task_id
+
+
+@task_postrun.connect
+def end_task_trace(task_id=None, **kwargs):
+    if getattr(_local, 'task_id', None) == task_id:
+        _local.task_id = None
+        end_trace()
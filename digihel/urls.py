@@ -6,8 +6,11 @@ from wagtail.core import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
 from digi.views import sitemap_view
+from digihel.views import cache_metrics_prometheus
 from events.views import event_data
 from feedback.views import FeedbackView
+from people import api as people_api
+from people.views import avatar
 from search import views as search_views
 from allauth import urls as allauth_urls
 from blog import urls as blog_urls
@@ -23,9 +26,17 @@ urlpatterns = [
     re_path(r'^accounts/', include(allauth_urls)),
 
     re_path(r'^search/$', search_views.search, name='search'),
+    re_path(r'^search/suggest/$', search_views.suggest, name='search_suggest'),
     re_path(r'^blogi/', include(blog_urls, namespace="blog")),
     re_path(r'^sivukartta/$', sitemap_view),
     re_path(r'^palaute/$', FeedbackView.as_view(), name='post_feedback'),
+    re_path(r'^avatars/(?P<avatar_hash>[0-9a-f]{40})/(?P<size>\d+)\.png$', avatar, name='person_avatar'),
+
+    re_path(r'^api/people/$', people_api.PersonList.as_view(), name='api_people'),
+    re_path(r'^api/groups/$', people_api.GroupList.as_view(), name='api_groups'),
+    re_path(r'^api/memberships/$', people_api.MembershipList.as_view(), name='api_memberships'),
+
+    re_path(r'^metrics/cache/$', cache_metrics_prometheus, name='cache_metrics_prometheus'),
 
     # client endpoints for external API data
     re_path(r'^event_data/', event_data),
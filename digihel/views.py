@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.utils.timezone import utc
+
+from digihel.cache import get_all_cache_metrics, render_prometheus_metrics
+from digihel.profiling import get_slowest_requests, summarize_by_page_type
+from digihel.tracing import build_waterfall, get_exporter, summarize_trace
+
+
+def require_metrics_access(request):
+    """
+    Let superusers and scrapers sending `Authorization: Bearer <METRICS_TOKEN>` read the metrics.
+
+    The client address is not used, since behind a proxy it is the address of the proxy.
+    """
+    if request.user.is_superuser:
+        return
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and authorization.startswith('Bearer ') and constant_time_compare(authorization[7:], token):
+        return
+    raise PermissionDenied
+
+
+def cache_metrics_prometheus(request):
+    require_metrics_access(request)
+    return HttpResponse(
+        render_prometheus_metrics(get_all_cache_metrics()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def cache_metrics_admin(request):
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    return render(request, 'digihel/admin/cache_metrics.html', {
+        'rows': get_all_cache_metrics(),
+    })
+
+
+def profiling_admin(request):
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    entries = get_slowest_requests()
+    return render(request, 'digihel/admin/profiling.html', {
+        'enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        'entries': entries,
+        'page_types': summarize_by_page_type(entries),
+    })
+
+
+def tracing_admin(request):
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    traces = [summarize_trace(spans) for spans in get_exporter().get_traces()]
+    for trace in traces:
+        trace['time'] = datetime.fromtimestamp(trace['start'], utc)
+    return render(request, 'digihel/admin/tracing.html', {
+        'enabled': getattr(settings, 'TRACING_ENABLED', False),
+        'traces': traces,
+    })
+
+
+def trace_admin(request, trace_id):
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    spans = next((spans for spans in get_exporter().get_traces() if spans[0]['trace_id'] == trace_id), None)
+    if spans is None:
+        raise Http404
+    trace = summarize_trace(spans)
+    trace['time'] = datetime.fromtimestamp(trace['start'], utc)
+    return render(request, 'digihel/admin/trace.html', {
+        'trace': trace,
+        'rows': build_waterfall(spans),
+    })
@@ -1,5 +1,12 @@
+from django.urls import re_path, reverse
+from django.utils.translation import ugettext_lazy as _
+from wagtail.admin.menu import MenuItem
 from wagtail.core import hooks
 
+from digihel.profiling import set_profiled_page
+from digihel.tracing import set_traced_page
+from digihel.views import cache_metrics_admin, profiling_admin, trace_admin, tracing_admin
+
 
 def allow_blindly(tag):
     return tag
@@ -13,3 +20,39 @@ def whitelister_element_rules():
     # Divs, spans, code and anchors
     rules.update(dict.fromkeys(['div', 'span', 'a', 'code', 'pre', 'blockquote', 'section'], allow_blindly))
     return rules
+
+
+@hooks.register('register_admin_urls')
+def register_cache_metrics_url():
+    return [
+        re_path(r'^cache-metrics/$', cache_metrics_admin, name='cache_metrics'),
+        re_path(r'^profiling/$', profiling_admin, name='profiling'),
+        re_path(r'^tracing/$', tracing_admin, name='tracing'),
+        re_path(r'^tracing/(?P<trace_id>[0-9a-f]+)/$', trace_admin, name='tracing_trace'),
+    ]
+
+
+class SuperuserMenuItem(MenuItem):
+    def is_shown(self, request):
+        return request.user.is_superuser
+
+
+@hooks.register('register_settings_menu_item')
+def register_cache_metrics_menu_item():
+    return SuperuserMenuItem(_('Cache metrics'), reverse('cache_metrics'), classnames='icon icon-cogs', order=900)
+
+
+@hooks.register('register_settings_menu_item')
+def register_profiling_menu_item():
+    return SuperuserMenuItem(_('Slow requests'), reverse('profiling'), classnames='icon icon-time', order=910)
+
+
+@hooks.register('register_settings_menu_item')
+def register_tracing_menu_item():
+    return SuperuserMenuItem(_('Traces'), reverse('tracing'), classnames='icon icon-list-ul', order=920)
+
+
+@hooks.register('before_serve_page')
+def record_profiled_page(page, request, serve_args, serve_kwargs):
+    set_profiled_page(request, page)
+    set_traced_page(page)
@@ -11,12 +11,23 @@ import pytz
 from enumfields import Enum
 from enumfields.fields import EnumIntegerField
 
+from digihel.tracing import span
+
 
 class DataSources(Enum):
     FACEBOOK = 0
     LINKEDEVENTS = 1
 
 
+EVENTS_FETCH_TIMEOUT = 10
+
+
+def fetch_json(url):
+    resp = requests.get(url, timeout=EVENTS_FETCH_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+
 class EventsIndexPage(Page):
     type = _('Events')
     data_source = EnumIntegerField(DataSources, verbose_name=_('Event data source'), default=DataSources.LINKEDEVENTS)
@@ -29,8 +40,14 @@ class EventsIndexPage(Page):
         FieldPanel('linkedevents_params'),
      ]
 
-    urls = {DataSources.FACEBOOK: "graph.facebook.com/v2.5/",
-            DataSources.LINKEDEVENTS: "api.hel.fi/linkedevents/v1/"}
+    # data source -> (setting, default) for the API base URL
+    api_urls = {DataSources.FACEBOOK: ('FACEBOOK_GRAPH_API_URL', 'https://graph.facebook.com/v2.5/'),
+                DataSources.LINKEDEVENTS: ('LINKEDEVENTS_API_URL', 'https://api.hel.fi/linkedevents/v1/')}
+
+    @property
+    def api_url(self):
+        setting, default = self.api_urls[self.data_source]
+        return getattr(settings, setting, default)
 
     def _facebook_events(self):
         if not hasattr(settings, 'FACEBOOK_APP_ID') or not hasattr(settings, 'FACEBOOK_APP_SECRET'):
@@ -40,12 +57,12 @@ class EventsIndexPage(Page):
             return events
         events = []
         # facebook feed returns events latest first
-        url = 'https://{}{}?fields=feed{{link,message,object_id}}&access_token={}|{}'.format(
-            self.urls[self.data_source],
+        url = '{}{}?fields=feed{{link,message,object_id}}&access_token={}|{}'.format(
+            self.api_url,
             self.facebook_page_id,
             str(settings.FACEBOOK_APP_ID),
             settings.FACEBOOK_APP_SECRET)
-        feed = requests.get(url).json()['feed']['data']
+        feed = fetch_json(url)['feed']['data']
 
         # filter the events from the feed
 
@@ -58,12 +75,12 @@ class EventsIndexPage(Page):
 
         event_ids = ','.join([event['object_id'] for event in events])
         details = []
-        url = 'https://{}?ids={}&fields=description,cover,end_time,name,start_time,id,picture,place&access_token={}|{}'.format(
-            self.urls[self.data_source],
+        url = '{}?ids={}&fields=description,cover,end_time,name,start_time,id,picture,place&access_token={}|{}'.format(
+            self.api_url,
             event_ids,
             str(settings.FACEBOOK_APP_ID),
             settings.FACEBOOK_APP_SECRET)
-        details = requests.get(url).json()
+        details = fetch_json(url)
         for event in events:
             event['details'] = details[event['object_id']]
         cache.add('facebook', events, 3600)
@@ -74,10 +91,10 @@ class EventsIndexPage(Page):
         if events:
             return events
         # the methods are assumed to return events latest first
-        url = 'https://{}event/{}&include=location&sort=-end_time&page_size=100'.format(
-            self.urls[self.data_source],
+        url = '{}event/{}&include=location&sort=-end_time&page_size=100'.format(
+            self.api_url,
             self.linkedevents_params)
-        event_list = requests.get(url).json()
+        event_list = fetch_json(url)
         events = event_list.get('data')
 
         # we will be happy with 100 latest events for now
@@ -89,8 +106,9 @@ class EventsIndexPage(Page):
 
     def events(self, future=False):
         try:
-            events = self._event_methods[self.data_source](self)
-        except (TimeoutError, ConnectionError, LookupError):
+            with span('events.{}'.format(self.data_source.name.lower()), 'integration'):
+                events = self._event_methods[self.data_source](self)
+        except (requests.RequestException, ValueError, LookupError):
             # if the event source is unreachable or down or data is invalid
             events = []
         if not future:
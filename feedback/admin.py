@@ -1,10 +1,46 @@
+from django.urls import re_path
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.utils.timezone import now
 
-from .models import Feedback, SlackNotifier
+from .export import EXPORT_FORMATS, iter_export
+from .models import Feedback, FeedbackDelivery, SlackNotifier
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class FeedbackDeliveryInline(admin.TabularInline):
+    model = FeedbackDelivery
+    fields = ('notifier', 'created_at', 'delivered_at', 'attempts', 'error')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
 
 
 class FeedbackAdmin(admin.ModelAdmin):
-    pass
+    inlines = [FeedbackDeliveryInline]
+
+    def get_urls(self):
+        urls = [
+            re_path(
+                r'^export/(?P<format>%s)/$' % '|'.join(EXPORT_FORMATS),
+                self.admin_site.admin_view(self.export_view),
+                name='feedback_feedback_export',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def export_view(self, request, format):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        response = StreamingHttpResponse(iter_export(format), content_type=EXPORT_CONTENT_TYPES[format])
+        filename = 'feedback-{}.{}'.format(now().strftime('%Y%m%d'), format)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        return response
 admin.site.register(Feedback, FeedbackAdmin)
 
 
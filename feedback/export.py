@@ -0,0 +1,90 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+
+from .models import Feedback, resolve_feedback_pages
+
+EXPORT_FIELDS = (
+    'id', 'created_at', 'url', 'page_title', 'page_url', 'subject', 'name', 'email', 'body', 'user_agent',
+)
+EXPORT_FORMATS = ('csv', 'jsonl')
+# Cells starting with these are taken as formulas by spreadsheet programs
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def iter_feedback_rows(queryset=None, chunk_size=None):
+    """
+    Iterate over feedback as export rows, reading the table with a server-side cursor.
+
+    The pages the feedback refers to are looked up once per chunk.
+
+    :param queryset: Feedback to export; all feedback by default
+    :type queryset: django.db.models.QuerySet|None
+    :param chunk_size: How many rows to fetch from the database at a time
+    :type chunk_size: int|None
+    :return: Rows in the order of `EXPORT_FIELDS`
+    :rtype: Iterable[list]
+    """
+    if queryset is None:
+        queryset = Feedback.objects.all()
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'FEEDBACK_EXPORT_CHUNK_SIZE', 2000)
+    feedbacks = queryset.order_by('pk').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(feedbacks, chunk_size))
+        if not chunk:
+            break
+        resolve_feedback_pages(chunk)
+        for feedback in chunk:
+            page_title, page_url = feedback.page_info or (None, None)
+            yield [
+                feedback.pk, feedback.created_at.isoformat(), feedback.url, page_title, page_url,
+                feedback.subject, feedback.name, feedback.email, feedback.body, feedback.user_agent,
+            ]
+
+
+class LineBuffer(object):
+    """
+    A file-like object that hands back what is written to it, for `csv.writer`.
+    """
+    def write(self, value):
+        return value
+
+
+def escape_csv_cell(value):
+    """
+    Keep a spreadsheet program from running user supplied text as a formula, by prefixing it with `'`.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([escape_csv_cell(value) for value in row])
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+def iter_export(format, queryset=None):
+    """
+    Iterate over the lines of a feedback export in the given format.
+
+    :param format: One of `EXPORT_FORMATS`
+    :type format: str
+    :rtype: Iterable[str]
+    """
+    rows = iter_feedback_rows(queryset)
+    if format == 'csv':
+        return iter_csv(rows)
+    if format == 'jsonl':
+        return iter_jsonl(rows)
+    raise ValueError('Unsupported export format: %s' % format)
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from feedback.export import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Exports all feedback as CSV or JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write to; standard output by default')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            out = open(options['output'], 'w', encoding='utf8', newline='')
+        else:
+            out = sys.stdout
+        try:
+            for line in iter_export(options['format']):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from feedback.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the feedback statistics of all pages from the feedback received so far'
+
+    def handle(self, *args, **options):
+        count = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt feedback statistics of {} pages'.format(count)))
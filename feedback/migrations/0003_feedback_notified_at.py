@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.2.1 on 2026-10-19 13:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_notified(apps, schema_editor):
+    # Don't send digests of everything received so far
+    Feedback = apps.get_model('feedback', 'Feedback')
+    Feedback.objects.update(notified_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0002_add_more_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedback',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_notified, migrations.RunPython.noop),
+    ]
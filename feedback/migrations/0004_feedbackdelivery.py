@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.2.1 on 2026-10-19 14:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0003_feedback_notified_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('feedback', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='feedback.Feedback')),
+                ('notifier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='feedback.Notifier')),
+            ],
+            options={
+                'unique_together': {('feedback', 'notifier')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.1 on 2026-10-19 05:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0041_group_collection_permissions_verbose_name_plural'),
+        ('feedback', '0004_feedbackdelivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageFeedbackDailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PageFeedbackStats',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feedback_stats', serialize=False, to='wagtailcore.Page', verbose_name='Page')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Feedback count')),
+                ('last_received_at', models.DateTimeField(null=True, verbose_name='Last received')),
+            ],
+            options={
+                'verbose_name': 'Page feedback statistics',
+                'verbose_name_plural': 'Page feedback statistics',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['content_type', 'object_id', 'created_at'], name='feedback_fe_content_92f3c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagefeedbackstats',
+            index=models.Index(fields=['-count'], name='feedback_pa_count_cce147_idx'),
+        ),
+        migrations.AddField(
+            model_name='pagefeedbackdailycount',
+            name='stats',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='feedback.PageFeedbackStats'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='pagefeedbackdailycount',
+            unique_together={('stats', 'date')},
+        ),
+    ]
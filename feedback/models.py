@@ -1,13 +1,19 @@
+import time
+
 import requests
 from django.apps import apps
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.cache import cache
 from django.db import models
 from django.utils import translation
+from django.utils.http import parse_http_date_safe
 from django.utils.translation import ugettext_lazy as _
 from django.utils.translation import gettext
+from wagtail.core.models import Site
+
+from digihel.mixins import get_test_site_ids, get_url_parts_for_path
 
 
 class Feedback(models.Model):
@@ -26,32 +32,105 @@ class Feedback(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.CASCADE)
+    notified_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
 
     class Meta:
         ordering = (('-created_at'),)
-
-    def notify(self):
-        if not Notifier.objects.exists():
-            return
-
-        notifier = Notifier.objects.first()
-        notifier.notify(self)
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'created_at']),
+        ]
 
     def __str__(self):
         return u'{url}: {subject}'.format(url=self.url, subject=self.subject)
 
 
+def resolve_feedback_pages(feedbacks):
+    """
+    Look up the Wagtail pages the given feedbacks refer to, in one query.
+
+    Sets `page_info` on each feedback to a `(title, full URL)` tuple,
+    or None if the feedback doesn't refer to a live page.
+
+    :param feedbacks: Feedback objects
+    :type feedbacks: list[Feedback]
+    """
+    Page = apps.get_model('wagtailcore', 'Page')
+    page_ids = set()
+    for feedback in feedbacks:
+        feedback.page_info = None
+        if feedback.content_type_id and feedback.object_id:
+            klass = ContentType.objects.get_for_id(feedback.content_type_id).model_class()
+            if klass and issubclass(klass, Page):
+                page_ids.add(feedback.object_id)
+    if not page_ids:
+        return
+    site_root_paths = Site.get_site_root_paths()
+    test_site_ids = get_test_site_ids()
+    page_info = {}
+    for page in Page.objects.filter(pk__in=page_ids).only('pk', 'title', 'url_path'):
+        url_parts = get_url_parts_for_path(page.url_path, site_root_paths, test_site_ids)
+        if url_parts is not None:
+            site_id, root_url, page_path = url_parts
+            page_info[page.pk] = (page.title, root_url + page_path)
+    for feedback in feedbacks:
+        if feedback.object_id in page_ids:
+            feedback.page_info = page_info.get(feedback.object_id)
+
+
 class Notifier(models.Model):
     type = models.CharField(max_length=20, choices=(('slack', 'Slack'),))
     url_base = models.CharField(max_length=200)
     language = models.CharField(max_length=20)
 
-    def notify(self, feedback):
+    def notify(self, feedbacks):
         if self.type == 'slack':
             notifier = self.slacknotifier
         else:
             raise NotImplementedError(_('Unsupported notifier type: %s' % self.type))
-        notifier.notify(feedback)
+        notifier.notify(feedbacks)
+
+
+class SlackRateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__('Slack rate limit reached, retry after %d seconds' % retry_after)
+        self.retry_after = retry_after
+
+
+class SlackNotifyFailed(Exception):
+    def __init__(self, status_code):
+        super().__init__('Slack notify failed with HTTP status %d' % status_code)
+        self.status_code = status_code
+
+    @property
+    def retryable(self):
+        """
+        Whether the failure is on Slack's side and may go away; other failures mean
+        the notifier is misconfigured, e.g. the webhook has been removed.
+        """
+        return self.status_code >= 500
+
+
+def parse_retry_after(value, default=1):
+    """
+    Parse a Retry-After header, given either as seconds or as an HTTP date.
+
+    :param value: Header value, if any
+    :type value: str|None
+    :param default: Seconds to use if the header is missing or invalid
+    :type default: int
+    :return: Seconds to wait
+    :rtype: int
+    """
+    if not value:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        pass
+    timestamp = parse_http_date_safe(value)
+    if timestamp is None:
+        return default
+    return max(int(timestamp - time.time()), 0)
 
 
 class SlackNotifier(Notifier):
@@ -61,32 +140,44 @@ class SlackNotifier(Notifier):
     icon_emoji = models.CharField(max_length=50, null=True, blank=True)
     icon_url = models.URLField(null=True, blank=True)
 
-    def notify(self, feedback):
+    def notify(self, feedbacks):
         """
-        Send a Slack notification for the given feedback.
+        Send one Slack notification for the given feedbacks.
 
-        :param feedback: Feedback object
-        :type feedback: feedback.models.Feedback
+        Slack allows about one message per second per webhook; if a message
+        was sent to this webhook within the last second, or Slack responds
+        with HTTP 429, `SlackRateLimited` is raised so the caller can retry later.
+        Other error responses raise `SlackNotifyFailed`.
+
+        :param feedbacks: Feedback objects
+        :type feedbacks: list[feedback.models.Feedback]
         """
-        data = self.build_slack_message(feedback)
-        resp = requests.post(self.webhook_url, json=data)
+        data = self.build_slack_message(feedbacks)
+        if not cache.add('slack_rate_limit_%d' % self.pk, True, 1):
+            raise SlackRateLimited(1)
+        resp = requests.post(self.webhook_url, json=data, timeout=10)
+        if resp.status_code == 429:
+            raise SlackRateLimited(parse_retry_after(resp.headers.get('Retry-After')))
         if resp.status_code != 200:
-            raise Exception('Slack notify failed with HTTP status %d' % resp.status_code)
+            raise SlackNotifyFailed(resp.status_code)
 
-    def build_slack_message(self, feedback):
+    def build_slack_message(self, feedbacks):
         """
-        Build a Slack message dict from the feedback object.
+        Build a Slack message dict from the feedback objects.
 
-        :param feedback: Feedback object
-        :type feedback: feedback.models.Feedback
+        :param feedbacks: Feedback objects
+        :type feedbacks: list[feedback.models.Feedback]
         :return: Slack message dict
         :rtype: dict
         """
         with translation.override(self.language):
-            message = gettext('New feedback received for {url}').format(url=feedback.url)
+            if len(feedbacks) == 1:
+                message = gettext('New feedback received for {url}').format(url=feedbacks[0].url)
+            else:
+                message = gettext('{count} new feedbacks received').format(count=len(feedbacks))
         data = {
             'text': message,
-            'attachments': [self.build_slack_attachment_from_feedback(feedback)],
+            'attachments': [self.build_slack_attachment_from_feedback(feedback) for feedback in feedbacks],
         }
         data.update(self._get_notifier_config_for_slack_message())
         return data
@@ -107,15 +198,10 @@ class SlackNotifier(Notifier):
         attachment['fields'] = fields = []
         # If the feedback refers to a Wagtail Page, add some more
         # information to the Slack notification.
-        try:
-            Page = apps.get_model('wagtailcore', 'Page')
-            klass = feedback.content_type.model_class()
-            if issubclass(klass, Page):
-                page = Page.objects.get(id=feedback.object_id)
-                attachment['title'] = page.title
-                attachment['title_link'] = page.full_url
-        except (LookupError, ObjectDoesNotExist):
-            pass
+        if not hasattr(feedback, 'page_info'):
+            resolve_feedback_pages([feedback])
+        if feedback.page_info:
+            attachment['title'], attachment['title_link'] = feedback.page_info
         with translation.override(self.language):
             if feedback.name:
                 fields.append({'title': gettext('Name'), 'value': feedback.name, 'short': False})
@@ -148,3 +234,53 @@ class SlackNotifier(Notifier):
             data['channel'] = self.channel
 
         return data
+
+
+class FeedbackDelivery(models.Model):
+    """
+    The delivery of a feedback notification through one notifier.
+    """
+    feedback = models.ForeignKey(Feedback, related_name='deliveries', on_delete=models.CASCADE)
+    notifier = models.ForeignKey(Notifier, related_name='deliveries', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = (('feedback', 'notifier'),)
+
+    def __str__(self):
+        return u'{feedback} -> {notifier}'.format(feedback=self.feedback_id, notifier=self.notifier_id)
+
+
+class PageFeedbackStats(models.Model):
+    """
+    How much feedback a page has received, kept up to date as feedback arrives.
+    """
+    page = models.OneToOneField('wagtailcore.Page', primary_key=True, related_name='feedback_stats',
+                                on_delete=models.CASCADE, verbose_name=_('Page'))
+    count = models.PositiveIntegerField(default=0, verbose_name=_('Feedback count'))
+    last_received_at = models.DateTimeField(null=True, verbose_name=_('Last received'))
+
+    class Meta:
+        verbose_name = _('Page feedback statistics')
+        verbose_name_plural = _('Page feedback statistics')
+        indexes = [
+            models.Index(fields=['-count']),
+        ]
+
+    def __str__(self):
+        return u'{page}: {count}'.format(page=self.page_id, count=self.count)
+
+
+class PageFeedbackDailyCount(models.Model):
+    stats = models.ForeignKey(PageFeedbackStats, related_name='daily_counts', on_delete=models.CASCADE)
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('stats', 'date'),)
+
+    def __str__(self):
+        return u'{page} {date}: {count}'.format(page=self.stats_id, date=self.date, count=self.count)
@@ -1,10 +1,19 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from .models import Feedback
-from .tasks import notify_new_feedback
+from .stats import record_feedback
+from .tasks import schedule_digest
 
 
 @receiver(post_save, sender=Feedback, dispatch_uid='send_feedback_notification')
-def send_feedback_notification(sender, instance, **kwargs):
-    notify_new_feedback.delay(instance.id)
+def send_feedback_notification(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(schedule_digest)
+
+
+@receiver(post_save, sender=Feedback, dispatch_uid='update_page_feedback_stats')
+def update_page_feedback_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_feedback(instance)
@@ -0,0 +1,75 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils.timezone import localdate
+from wagtail.core.models import Page, get_page_models
+
+from .models import Feedback, PageFeedbackDailyCount, PageFeedbackStats
+
+
+def get_page_content_type_ids():
+    content_types = ContentType.objects.get_for_models(*get_page_models(), for_concrete_models=False)
+    return [content_type.pk for content_type in content_types.values()]
+
+
+def _increment(model, lookup, **updates):
+    """
+    Add one to the `count` of the row matching `lookup`, creating the row if needed.
+    """
+    updates['count'] = F('count') + 1
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup)
+    except IntegrityError:
+        # Created concurrently
+        pass
+    model.objects.filter(**lookup).update(**updates)
+
+
+def record_feedback(feedback):
+    """
+    Count new feedback into the statistics of the page it refers to.
+
+    :param feedback: Newly created feedback
+    :type feedback: feedback.models.Feedback
+    """
+    if not feedback.object_id or feedback.content_type_id not in get_page_content_type_ids():
+        return
+    if not Page.objects.filter(pk=feedback.object_id).exists():
+        return
+    received_at = feedback.created_at
+    _increment(
+        PageFeedbackStats, {'page_id': feedback.object_id},
+        last_received_at=Greatest(Coalesce('last_received_at', received_at), received_at),
+    )
+    _increment(PageFeedbackDailyCount, {'stats_id': feedback.object_id, 'date': localdate(received_at)})
+
+
+def rebuild_stats():
+    """
+    Recompute all page feedback statistics from the feedback table.
+
+    :return: Number of pages with feedback
+    :rtype: int
+    """
+    feedbacks = Feedback.objects.filter(
+        content_type_id__in=get_page_content_type_ids(),
+        object_id__in=Page.objects.values('pk'),
+    ).order_by()
+    with transaction.atomic():
+        PageFeedbackStats.objects.all().delete()
+        PageFeedbackStats.objects.bulk_create([
+            PageFeedbackStats(page_id=row['object_id'], count=row['count'], last_received_at=row['last_received_at'])
+            for row in feedbacks.values('object_id').annotate(count=Count('pk'), last_received_at=Max('created_at'))
+        ], batch_size=1000)
+        daily_counts = (
+            feedbacks.annotate(date=TruncDate('created_at')).values('object_id', 'date').annotate(count=Count('pk'))
+        )
+        PageFeedbackDailyCount.objects.bulk_create([
+            PageFeedbackDailyCount(stats_id=row['object_id'], date=row['date'], count=row['count'])
+            for row in daily_counts
+        ], batch_size=1000)
+    return PageFeedbackStats.objects.count()
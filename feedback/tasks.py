@@ -1,9 +1,138 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from .models import (
+    Feedback, FeedbackDelivery, Notifier, SlackNotifyFailed, SlackRateLimited, resolve_feedback_pages
+)
+
+log = logging.getLogger(__name__)
+
+DIGEST_SCHEDULED_CACHE_KEY = 'feedback_digest_scheduled'
+
+
+def schedule_digest():
+    """
+    Schedule a digest of pending feedback to be sent after `FEEDBACK_DIGEST_WINDOW` seconds.
+
+    Feedback received while a digest is already scheduled is included in that digest.
+    """
+    window = getattr(settings, 'FEEDBACK_DIGEST_WINDOW', 60)
+    if cache.add(DIGEST_SCHEDULED_CACHE_KEY, True, window):
+        send_feedback_digest.apply_async(countdown=window)
+
+
+def _claim_feedbacks(max_items):
+    """
+    Mark pending feedbacks as dispatched and create a delivery for each notifier.
+
+    :return: Whether more feedback is left pending
+    :rtype: bool
+    """
+    notifier_ids = list(Notifier.objects.values_list('pk', flat=True))
+    with transaction.atomic():
+        pending = Feedback.objects.filter(notified_at__isnull=True)
+        feedback_ids = list(
+            pending.select_for_update(skip_locked=True).order_by('created_at').values_list('pk', flat=True)[:max_items]
+        )
+        FeedbackDelivery.objects.bulk_create([
+            FeedbackDelivery(feedback_id=feedback_id, notifier_id=notifier_id)
+            for feedback_id in feedback_ids for notifier_id in notifier_ids
+        ], ignore_conflicts=True)
+        Feedback.objects.filter(pk__in=feedback_ids).update(notified_at=now())
+    return pending.exists()
+
+
+def _deliver(notifier, feedbacks):
+    # Runs in a worker thread, so it must not touch the database
+    try:
+        notifier.notify(feedbacks)
+    except Exception as exc:
+        return exc
+    return None
+
+
+def deliver_pending(max_items):
+    """
+    Send the undelivered feedback of each notifier as one digest, to all notifiers concurrently.
+
+    A failing notifier doesn't affect the others; its deliveries are left
+    pending, up to `FEEDBACK_DELIVERY_MAX_ATTEMPTS` attempts. A misconfigured
+    notifier won't start working by retrying, so its deliveries are given up at once.
+
+    :return: Seconds to wait before retrying failed or rate limited deliveries (None if none),
+             and whether more undelivered feedback than fit in the digests is left
+    :rtype: tuple[int|None, bool]
+    """
+    max_attempts = getattr(settings, 'FEEDBACK_DELIVERY_MAX_ATTEMPTS', 5)
+    deliveries = (
+        FeedbackDelivery.objects.filter(delivered_at__isnull=True, attempts__lt=max_attempts)
+        .select_related('feedback', 'notifier', 'notifier__slacknotifier').order_by('feedback__created_at')
+    )
+    batches = OrderedDict()
+    for delivery in deliveries:
+        batch = batches.setdefault(delivery.notifier_id, (delivery.notifier, []))[1]
+        if len(batch) < max_items:
+            batch.append(delivery)
+    if not batches:
+        return None, False
+
+    # Resolve each page once and share it between all notifiers
+    feedbacks = {}
+    for notifier, batch in batches.values():
+        for delivery in batch:
+            delivery.feedback = feedbacks.setdefault(delivery.feedback_id, delivery.feedback)
+    resolve_feedback_pages(list(feedbacks.values()))
+
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        futures = [
+            (batch, executor.submit(_deliver, notifier, [delivery.feedback for delivery in batch]))
+            for notifier, batch in batches.values()
+        ]
+        results = [(batch, future.result()) for batch, future in futures]
+
+    retry_after = None
+    backlog = any(len(batch) == max_items for notifier, batch in batches.values())
+    for batch, exc in results:
+        ids = [delivery.pk for delivery in batch]
+        if exc is None:
+            FeedbackDelivery.objects.filter(pk__in=ids).update(delivered_at=now(), attempts=F('attempts') + 1, error='')
+            continue
+        if isinstance(exc, SlackRateLimited):
+            # Not a failure; don't use up the attempts
+            retry_after = max(retry_after or 0, exc.retry_after)
+            continue
+        if isinstance(exc, SlackNotifyFailed) and not exc.retryable:
+            log.error('Feedback notification through notifier %d failed, check its configuration: %s',
+                      batch[0].notifier_id, exc)
+            FeedbackDelivery.objects.filter(pk__in=ids).update(attempts=max_attempts, error=str(exc))
+            continue
+        log.warning('Feedback notification through notifier %d failed: %s', batch[0].notifier_id, exc)
+        FeedbackDelivery.objects.filter(pk__in=ids).update(attempts=F('attempts') + 1, error=str(exc))
+        retry_after = max(retry_after or 0, 60)
+    return retry_after, backlog
+
 
-from .models import Feedback
+@shared_task(bind=True, max_retries=10)
+def send_feedback_digest(self):
+    max_items = getattr(settings, 'FEEDBACK_DIGEST_MAX_ITEMS', 20)
+    more_pending = _claim_feedbacks(max_items)
+    retry_after, backlog = deliver_pending(max_items)
+    if retry_after is not None:
+        raise self.retry(countdown=retry_after)
+    if more_pending or backlog:
+        # More than one digest's worth; send the rest right away without using up the retries
+        send_feedback_digest.apply_async(countdown=1)
 
 
 @shared_task
 def notify_new_feedback(feedback_id):
-    obj = Feedback.objects.get(id=feedback_id)
-    obj.notify()
+    # Tasks queued before digests were introduced
+    schedule_digest()
@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+DEFAULT_RATES = {
+    'feedback_ip': '10/hour',
+    'feedback_url': '60/hour',
+}
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    A throttle that keeps a token bucket per client in the shared cache.
+
+    The rate `n/period` gives a bucket of `n` tokens that refills at `n` tokens
+    per period, so short bursts are allowed but sustained floods aren't.
+    The buckets are read and written without locking, so concurrent
+    requests may occasionally get a token too many.
+    """
+    cache = cache
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    def get_rate(self):
+        rates = getattr(settings, 'FEEDBACK_THROTTLE_RATES', DEFAULT_RATES)
+        return rates.get(self.scope, DEFAULT_RATES[self.scope])
+
+    def get_ident_for_request(self, request):
+        """
+        Get the identity of the bucket the request takes a token from; the client address by default.
+
+        :return: Identity, or None to not throttle the request
+        :rtype: str|None
+        """
+        return self.get_ident(request)
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_for_request(request)
+        if not ident:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.md5(ident.encode('utf8')).hexdigest(),
+        }
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        now = time.time()
+        tokens, updated_at = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - updated_at) * self.num_requests / self.duration)
+        self.tokens = tokens
+        if tokens < 1:
+            return False
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class FeedbackIPThrottle(TokenBucketThrottle):
+    scope = 'feedback_ip'
+
+
+class FeedbackURLThrottle(TokenBucketThrottle):
+    scope = 'feedback_url'
+
+    def get_ident_for_request(self, request):
+        # The body may be any JSON; leave invalid ones to the serializer
+        url = request.data.get('url') if isinstance(request.data, dict) else None
+        return url if isinstance(url, str) else None
+
+
+def is_duplicate(request, data):
+    """
+    Check whether the same feedback was already submitted within `FEEDBACK_DUPLICATE_WINDOW` seconds.
+
+    Feedback is considered the same if it comes from the same address for
+    the same URL, and its text differs at most in case and whitespace.
+
+    :param request: The request submitting the feedback
+    :type request: rest_framework.request.Request
+    :param data: Validated feedback data
+    :type data: dict
+    :rtype: bool
+    """
+    parts = [BaseThrottle().get_ident(request), data.get('url')]
+    for field in ('subject', 'name', 'email', 'body'):
+        parts.append(' '.join((data.get(field) or '').casefold().split()))
+    digest = hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf8')).hexdigest()
+    window = getattr(settings, 'FEEDBACK_DUPLICATE_WINDOW', 600)
+    return not cache.add('feedback_duplicate_%s' % digest, True, window)
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Feedback
+from .throttling import FeedbackIPThrottle, FeedbackURLThrottle, is_duplicate
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
@@ -15,6 +16,8 @@ class FeedbackSerializer(serializers.ModelSerializer):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class FeedbackView(APIView):
+    throttle_classes = (FeedbackIPThrottle, FeedbackURLThrottle)
+
     @csrf_exempt
     def post(self, request, format=None):
         if self.request.user.is_authenticated():
@@ -30,6 +33,9 @@ class FeedbackView(APIView):
 
         serializer = FeedbackSerializer(data=request.data)
         if serializer.is_valid():
+            if is_duplicate(request, serializer.validated_data):
+                # Pretend success so that resubmitting doesn't look like it helps
+                return Response(serializer.data, status=status.HTTP_200_OK)
             serializer.save(user=user, user_agent=user_agent)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
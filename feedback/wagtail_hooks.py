@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.utils.timezone import localdate
+from django.utils.translation import ugettext_lazy as _
+from wagtail.contrib.modeladmin.helpers import PermissionHelper
+from wagtail.contrib.modeladmin.options import ModelAdmin, modeladmin_register
+
+from .models import PageFeedbackStats
+
+
+class ReportPermissionHelper(PermissionHelper):
+    # The statistics are maintained automatically
+    def user_can_create(self, user):
+        return False
+
+    def user_can_edit_obj(self, user, obj):
+        return False
+
+    def user_can_delete_obj(self, user, obj):
+        return False
+
+
+class PageFeedbackStatsAdmin(ModelAdmin):
+    """
+    Report of the pages that have received the most feedback.
+    """
+    model = PageFeedbackStats
+    menu_label = _("Feedback by page")
+    menu_icon = 'mail'
+    list_display = ('page', 'count', 'recent_count', 'last_received_at')
+    ordering = ('-count',)
+    search_fields = ('page__title',)
+    permission_helper_class = ReportPermissionHelper
+
+    def get_queryset(self, request):
+        since = localdate() - timedelta(days=30)
+        return super().get_queryset(request).select_related('page').annotate(
+            recent_count=Sum('daily_counts__count', filter=Q(daily_counts__date__gt=since)),
+        )
+
+    def recent_count(self, obj):
+        return obj.recent_count or 0
+    recent_count.short_description = _("Last 30 days")
+    recent_count.admin_order_field = 'recent_count'
+
+
+modeladmin_register(PageFeedbackStatsAdmin)
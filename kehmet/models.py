@@ -7,11 +7,11 @@ from wagtail.admin.edit_handlers import FieldPanel, StreamFieldPanel, MultiField
 from wagtail.core import blocks
 from wagtail.core.fields import StreamField
 from wagtail.core.models import Page
-from wagtail.search import index
 
 from content.models import content_blocks
 from digihel.mixins import RelativeURLMixin
-from search.fields import tag_search_field
+from search.fields import body_search_field, tag_search_field
+from search.mixins import SearchTextMixin
 
 
 class BaseModel(models.Model):
@@ -70,14 +70,14 @@ class UserRolePage(RelativeURLMixin, Page):
     parent_page_types = ['UserRoleIndex']
 
 
-class KehmetFrontPage(RelativeURLMixin, Page):
+class KehmetFrontPage(SearchTextMixin, RelativeURLMixin, Page):
     body = StreamField(content_blocks)
 
     content_panels = Page.content_panels + [
         StreamFieldPanel('body')
     ]
     search_fields = Page.search_fields + [
-        index.SearchField('body')
+        body_search_field
     ]
 
     subpage_types = ['KehmetContentPage']
@@ -87,7 +87,7 @@ class KehmetContentPageTag(TaggedItemBase):
     content_object = ParentalKey('kehmet.KehmetContentPage', related_name='tagged_items')
 
 
-class KehmetContentPage(RelativeURLMixin, Page):
+class KehmetContentPage(SearchTextMixin, RelativeURLMixin, Page):
     body = StreamField(content_blocks)
     tags = ClusterTaggableManager(through=KehmetContentPageTag, blank=True)
     show_in_submenus = models.BooleanField(verbose_name=_('Show in sub menus'), help_text=_('Page is visible on the submenu'), default=True)
@@ -103,7 +103,7 @@ class KehmetContentPage(RelativeURLMixin, Page):
     ]
 
     search_fields = Page.search_fields + [
-        index.SearchField('body'),
+        body_search_field,
         tag_search_field,
     ]
 
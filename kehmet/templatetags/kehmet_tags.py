@@ -9,7 +9,7 @@ register = template.Library()
 def list_children(page, target_page):
 
     if getattr(page.specific, 'show_in_submenus', True):
-        if page.specific == target_page:
+        if page.pk == target_page.pk:
             is_me = True
         else:
             is_me = False
@@ -20,7 +20,8 @@ def list_children(page, target_page):
 
         children_html = ''
         if is_parent or is_me:
-            children = page.get_children().live().public().order_by('path')
+            # Specific, for show_in_submenus
+            children = page.get_children().live().public().order_by('path').specific()
             for child in children:
                 children_html += list_children(child, target_page)
 
@@ -4,6 +4,8 @@ import feedparser
 from django.conf import settings
 from django.core.cache import cache
 
+from digihel.tracing import span
+
 
 def convert_http_to_https(url):
     url = url.replace("http://", "https://") if url and url.startswith('http://') else url
@@ -46,5 +48,6 @@ def get_news(base_url):
 
 
 def get_news_feeds():
-    feed = feedparser.parse(settings.NEWS_FEED_URL)
+    with span('feedparser.parse', 'http', url=settings.NEWS_FEED_URL):
+        feed = feedparser.parse(settings.NEWS_FEED_URL)
     return feed.entries
@@ -0,0 +1,184 @@
+import hashlib
+
+from rest_framework import generics, serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .cache import get_change_counters
+from .models import Group, Membership, Person
+
+
+class SparseFieldsSerializer(serializers.ModelSerializer):
+    """
+    A serializer that only includes the fields listed in the `fields` query parameter, if given.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request else None
+        if fields:
+            wanted = set(fields.split(','))
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class RoleSerializer(serializers.Serializer):
+    page = serializers.IntegerField()
+    role = serializers.CharField()
+
+
+class PersonSerializer(SparseFieldsSerializer):
+    groups = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    theme_roles = serializers.SerializerMethodField()
+    project_roles = serializers.SerializerMethodField()
+    avatar_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Person
+        fields = ('id', 'first_name', 'last_name', 'title', 'email', 'telephone', 'avatar_url',
+                  'groups', 'theme_roles', 'project_roles')
+
+    def get_theme_roles(self, obj):
+        return [{'page': role.theme_id, 'role': role.role} for role in obj.theme_roles.all()]
+
+    def get_project_roles(self, obj):
+        return [{'page': role.project_id, 'role': role.role} for role in obj.project_roles.all()]
+
+    def get_avatar_url(self, obj):
+        return obj.get_avatar_url(80)
+
+
+class GroupSerializer(SparseFieldsSerializer):
+    class Meta:
+        model = Group
+        fields = ('id', 'name')
+
+
+class MembershipSerializer(SparseFieldsSerializer):
+    class Meta:
+        model = Membership
+        fields = ('id', 'group', 'person')
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Check whether an ETag matches an If-None-Match header, using the weak comparison.
+
+    :param etag: Current ETag, quoted
+    :type etag: str
+    :param if_none_match: Value of the If-None-Match header: `*` or a comma separated list of ETags
+    :type if_none_match: str
+    :rtype: bool
+    """
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    if '*' in tags:
+        return True
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+class ChangeCounterETagListView(generics.ListAPIView):
+    """
+    A list view that supports conditional requests with ETags.
+
+    The ETag is computed from the change counters of `etag_models` and the
+    query string, so it changes whenever any object of those models changes.
+    """
+    pagination_class = IdCursorPagination
+    etag_models = ()
+
+    def get_etag(self, request):
+        counters = get_change_counters(self.etag_models)
+        data = '{}|{}'.format(','.join(str(counter) for counter in counters), request.get_full_path())
+        return '"{}"'.format(hashlib.md5(data.encode('utf8')).hexdigest())
+
+    def get_id_filters(self, names):
+        """
+        Get the id filters given in the query parameters.
+
+        :param names: Names of the filter parameters
+        :type names: list[str]
+        :return: Dict of parameter name to id, for the given parameters
+        :rtype: dict[str, int]
+        :raises ValidationError: if a value is not an integer, which gives a 400 response
+        """
+        filters = {}
+        errors = {}
+        for name in names:
+            value = self.request.query_params.get(name)
+            if not value:
+                continue
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                errors[name] = ['A valid integer is required.']
+        if errors:
+            raise ValidationError(errors)
+        return filters
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+
+class PersonList(ChangeCounterETagListView):
+    """
+    People, filterable by `group`, `theme` and `project` ids.
+
+    Only for authenticated users, since the people have contact information.
+    """
+    serializer_class = PersonSerializer
+    permission_classes = (IsAuthenticated,)
+
+    @property
+    def etag_models(self):
+        from digi.models import ProjectRole, ThemeRole
+        return [Person, Membership, ThemeRole, ProjectRole]
+
+    def get_queryset(self):
+        queryset = Person.objects.prefetch_related('groups', 'theme_roles', 'project_roles')
+        filters = self.get_id_filters(['group', 'theme', 'project'])
+        if 'group' in filters:
+            queryset = queryset.filter(memberships__group=filters['group'])
+        if 'theme' in filters:
+            queryset = queryset.filter(theme_roles__theme=filters['theme'])
+        if 'project' in filters:
+            queryset = queryset.filter(project_roles__project=filters['project'])
+        return queryset.distinct()
+
+
+class GroupList(ChangeCounterETagListView):
+    serializer_class = GroupSerializer
+    queryset = Group.objects.all()
+    etag_models = [Group]
+
+
+class MembershipList(ChangeCounterETagListView):
+    """
+    Memberships, filterable by `group` and `person` ids.
+    """
+    serializer_class = MembershipSerializer
+    etag_models = [Membership]
+
+    def get_queryset(self):
+        queryset = Membership.objects.all()
+        filters = self.get_id_filters(['group', 'person'])
+        if 'group' in filters:
+            queryset = queryset.filter(group=filters['group'])
+        if 'person' in filters:
+            queryset = queryset.filter(person=filters['person'])
+        return queryset
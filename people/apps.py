@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PeopleConfig(AppConfig):
     name = 'people'
+
+    def ready(self):
+        from .signals import register_signal_handlers
+        register_signal_handlers()
@@ -0,0 +1,86 @@
+import hashlib
+import io
+import logging
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+log = logging.getLogger(__name__)
+
+AVATAR_SIZES = (40, 80, 240)
+AVATAR_FETCH_TIMEOUT = 10
+
+
+def get_source_avatar_url(email, size):
+    identifier = email or hashlib.md5(''.encode('utf8')).hexdigest()
+    base_url = getattr(settings, 'AVATAR_API_URL', 'https://api.hel.fi/avatar/')
+    return '{base}{id}?s={size}'.format(base=base_url, id=identifier, size=size)
+
+
+def get_avatar_path(avatar_hash, size):
+    return 'avatars/{}/{}.png'.format(avatar_hash, size)
+
+
+def get_variant_size(size):
+    """
+    Get the smallest stored avatar size that is at least `size` pixels, or the largest one.
+    """
+    for variant_size in AVATAR_SIZES:
+        if variant_size >= size:
+            return variant_size
+    return AVATAR_SIZES[-1]
+
+
+def store_avatar(content):
+    """
+    Store resized variants of an avatar image under its content hash.
+
+    Variants that already exist are not stored again, so people sharing the
+    same (e.g. default) avatar share the files too. Only the variants at the
+    paths given by `get_avatar_path` are kept, even if two processes store
+    the same avatar at once.
+
+    :param content: Source image data
+    :type content: bytes
+    :return: Content hash of the source image
+    :rtype: str
+    """
+    avatar_hash = hashlib.sha1(content).hexdigest()
+    image = None
+    for size in AVATAR_SIZES:
+        path = get_avatar_path(avatar_hash, size)
+        if default_storage.exists(path):
+            continue
+        if image is None:
+            image = Image.open(io.BytesIO(content))
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        output = io.BytesIO()
+        ImageOps.fit(image, (size, size), Image.LANCZOS).save(output, format='PNG', optimize=True)
+        saved_path = default_storage.save(path, ContentFile(output.getvalue()))
+        if saved_path != path:
+            # Another process stored the same variant meanwhile, and the storage
+            # gave this copy another name; the variants of a hash are identical
+            default_storage.delete(saved_path)
+    return avatar_hash
+
+
+def fetch_avatar(person):
+    """
+    Fetch the avatar of a person from the avatar service and store it locally.
+
+    :param person: Person object
+    :type person: people.models.Person
+    :return: Content hash of the avatar, or None if fetching failed
+    :rtype: str|None
+    """
+    url = get_source_avatar_url(person.email, AVATAR_SIZES[-1])
+    try:
+        resp = requests.get(url, timeout=AVATAR_FETCH_TIMEOUT)
+        resp.raise_for_status()
+        return store_avatar(resp.content)
+    except (requests.RequestException, IOError):
+        log.warning('error fetching avatar for %s', person, exc_info=True)
+        return None
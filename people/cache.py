@@ -0,0 +1,43 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_initial_counter():
+    # A counter lost from the cache must not start again from a value it has
+    # had before, or earlier ETags would match again
+    return int(time.time() * 1000)
+
+
+def get_change_counter_key(model):
+    return 'change_counter_{}'.format(model._meta.label_lower)
+
+
+def get_change_counters(models):
+    """
+    Get the change counters of the given models.
+
+    A change counter is bumped whenever an object of the model is saved or
+    deleted, so it can be used in cache keys and ETags.
+
+    :param models: Model classes
+    :type models: list[type]
+    :return: Change counters, in the same order as the models
+    :rtype: list[int]
+    """
+    keys = [get_change_counter_key(model) for model in models]
+    counters = cache.get_many(keys)
+    for key in keys:
+        if key not in counters:
+            initial = get_initial_counter()
+            cache.add(key, initial, None)
+            counters[key] = cache.get(key, initial)
+    return [counters[key] for key in keys]
+
+
+def bump_change_counter(model):
+    key = get_change_counter_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, get_initial_counter(), None)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from people.models import Person
+from people.tasks import fetch_person_avatar
+
+
+class Command(BaseCommand):
+    help = 'Fetches the avatars of all people from the avatar service and stores them locally'
+
+    def handle(self, *args, **options):
+        for person_id in Person.objects.values_list('id', flat=True):
+            fetch_person_avatar(person_id)
+        self.stdout.write(self.style.SUCCESS('Successfully fetched avatars'))
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.2.1 on 2026-10-19 13:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0004_personindexpage_body'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='avatar_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+    ]
@@ -1,13 +1,20 @@
-import hashlib
-
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Prefetch
+from django.urls import reverse
 from wagtail.admin.edit_handlers import FieldPanel
 from wagtail.core.models import Page
 from wagtail.core.fields import RichTextField
 
-from digihel.mixins import RelativeURLMixin
+from content.fragments import URL_GENERATION_CACHE_KEY
+from digi.utils import get_generation
+from digihel.mixins import RelativeURLMixin, get_page_urls
+from people.avatars import get_source_avatar_url, get_variant_size
+from people.cache import get_change_counters
 from users.models import User
 
+DIRECTORY_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 class Person(models.Model):
     user = models.OneToOneField(User, null=True, blank=True, on_delete=models.CASCADE)
@@ -16,13 +23,23 @@ class Person(models.Model):
     email = models.EmailField(null=True, blank=True)
     telephone = models.CharField(max_length=100, null=True, blank=True)
     title = models.CharField(max_length=100, null=True, blank=True)
+    avatar_hash = models.CharField(max_length=40, null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ('last_name', 'first_name')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The avatar is fetched again only when the email changes, see people.signals
+        instance._loaded_email = instance.__dict__.get('email')
+        return instance
+
     def get_avatar_url(self, size=40):
-        identifier = self.email or hashlib.md5(''.encode('utf8')).hexdigest()
-        return 'https://api.hel.fi/avatar/{id}?s={size}'.format(id=identifier, size=size)
+        if self.avatar_hash:
+            # Served from our own origin, see people.views.avatar
+            return reverse('person_avatar', args=(self.avatar_hash, get_variant_size(size)))
+        return get_source_avatar_url(self.email, size)
 
     def get_display_name(self):
         return "{} {}".format(self.first_name, self.last_name)
@@ -75,3 +92,51 @@ class PersonIndexPage(RelativeURLMixin, Page):
 
     def get_people(self):
         return Person.objects.all()
+
+    @staticmethod
+    def get_directory_models():
+        from digi.models import ProjectRole, ThemeRole
+        return [Person, Group, Membership, ThemeRole, ProjectRole]
+
+    def get_directory(self):
+        """
+        Get all people with their groups and roles, for rendering the directory.
+
+        The roles have their page URL resolved as `page_url`. The directory is
+        cached until a person, group, membership or role changes.
+
+        :rtype: list[Person]
+        """
+        counters = get_change_counters(self.get_directory_models())
+        counters.append(get_generation(URL_GENERATION_CACHE_KEY))
+        cache_key = 'person_directory_{}'.format('_'.join(str(counter) for counter in counters))
+        directory = cache.get(cache_key)
+        if directory is None:
+            directory = self.build_directory()
+            cache.set(cache_key, directory, DIRECTORY_CACHE_TIMEOUT)
+        return directory
+
+    def build_directory(self):
+        from digi.models import ProjectRole, ThemeRole
+
+        # Only load the page fields the directory shows; the cached directory is pickled,
+        # and page bodies can't be
+        people = list(Person.objects.prefetch_related(
+            'groups',
+            Prefetch('theme_roles', queryset=ThemeRole.objects.select_related('theme').only(
+                'sort_order', 'person', 'role', 'theme__title', 'theme__url_path',
+            )),
+            Prefetch('project_roles', queryset=ProjectRole.objects.select_related('project').only(
+                'sort_order', 'person', 'role', 'project__title', 'project__url_path',
+            )),
+        ))
+        theme_roles = [role for person in people for role in person.theme_roles.all()]
+        project_roles = [role for person in people for role in person.project_roles.all()]
+        page_urls = get_page_urls(
+            [role.theme for role in theme_roles] + [role.project for role in project_roles]
+        )
+        for role in theme_roles:
+            role.page_url = page_urls.get(role.theme_id)
+        for role in project_roles:
+            role.page_url = page_urls.get(role.project_id)
+        return people
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from wagtail.core.signals import page_published, page_unpublished
+
+from .cache import bump_change_counter
+from .models import Person, PersonIndexPage
+
+
+def bump_change_counter_on_change(sender, **kwargs):
+    bump_change_counter(sender)
+
+
+def bump_role_counters_on_publish(sender, instance, **kwargs):
+    # The directory shows the titles of the themes and projects people have roles in
+    from digi.models import ProjectPage, ProjectRole, ThemePage, ThemeRole
+
+    if isinstance(instance, ThemePage):
+        bump_change_counter(ThemeRole)
+    elif isinstance(instance, ProjectPage):
+        bump_change_counter(ProjectRole)
+
+
+def fetch_avatar_on_save(sender, instance, created, **kwargs):
+    from .tasks import fetch_person_avatar
+
+    email_changed = created or instance.email != getattr(instance, '_loaded_email', None)
+    instance._loaded_email = instance.email
+    # Fetching may also have failed before
+    if email_changed or not instance.avatar_hash:
+        transaction.on_commit(lambda: fetch_person_avatar.delay(instance.id))
+
+
+def register_signal_handlers():
+    for model in PersonIndexPage.get_directory_models():
+        uid = 'people_bump_change_counter_{}'.format(model._meta.label_lower)
+        post_save.connect(bump_change_counter_on_change, sender=model, dispatch_uid=uid)
+        post_delete.connect(bump_change_counter_on_change, sender=model, dispatch_uid=uid)
+    page_published.connect(bump_role_counters_on_publish, dispatch_uid='people_bump_role_counters')
+    page_unpublished.connect(bump_role_counters_on_publish, dispatch_uid='people_bump_role_counters')
+    post_save.connect(fetch_avatar_on_save, sender=Person, dispatch_uid='people_fetch_avatar')
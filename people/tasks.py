@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from .avatars import fetch_avatar
+from .cache import bump_change_counter
+from .models import Person
+
+
+@shared_task(ignore_result=True)
+def fetch_person_avatar(person_id):
+    person = Person.objects.filter(id=person_id).first()
+    if person is None:
+        return
+    avatar_hash = fetch_avatar(person)
+    if avatar_hash and avatar_hash != person.avatar_hash:
+        # Use update() so that saving does not queue another fetch
+        Person.objects.filter(id=person_id).update(avatar_hash=avatar_hash)
+        bump_change_counter(Person)
@@ -6,3 +6,16 @@ register = template.Library()
 @register.simple_tag
 def person_avatar(person, size=80):
     return person.get_avatar_url(size)
+
+
+@register.simple_tag
+def page_roles(page):
+    """
+    Get the roles of a page with their people, in one query:
+    {% page_roles page as roles %}
+
+    Pages without roles give an empty list.
+    """
+    if not hasattr(page, 'roles'):
+        return []
+    return list(page.roles.select_related('person'))
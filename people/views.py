@@ -0,0 +1,17 @@
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+
+from .avatars import AVATAR_SIZES, get_avatar_path
+
+AVATAR_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def avatar(request, avatar_hash, size):
+    size = int(size)
+    path = get_avatar_path(avatar_hash, size)
+    if size not in AVATAR_SIZES or not default_storage.exists(path):
+        raise Http404()
+    response = FileResponse(default_storage.open(path), content_type='image/png')
+    # The URL contains the hash of the image, so it can be cached forever
+    response['Cache-Control'] = 'public, max-age={}, immutable'.format(AVATAR_MAX_AGE)
+    return response
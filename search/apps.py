@@ -8,3 +8,6 @@ class SearchAppConfig(AppConfig):
 
     def ready(self):
         patch_blog_page_search()
+        # Import the module to cause registration of the signals
+        from .signals import register_queue_signal_handlers
+        register_queue_signal_handlers()
@@ -0,0 +1,113 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from wagtail.core.models import Page
+
+from digi.utils import bump_generation, get_generation
+
+GENERATION_CACHE_KEY = 'search_generation'
+
+
+def normalize_query(query):
+    """
+    Normalize a search query for use as a cache key.
+
+    Case-folds the query and collapses all runs of whitespace into single spaces.
+
+    :param query: Search query as entered by the user
+    :type query: str
+    :return: Normalized query
+    :rtype: str
+    """
+    return ' '.join(query.casefold().split())
+
+
+def get_search_generation():
+    return get_generation(GENERATION_CACHE_KEY)
+
+
+def bump_search_generation():
+    """
+    Invalidate all cached search results by moving to a new generation.
+
+    Results stored under older generations are never read again and
+    simply age out of the cache.
+    """
+    bump_generation(GENERATION_CACHE_KEY)
+
+
+def get_result_cache_key(query):
+    digest = hashlib.md5(normalize_query(query).encode('utf8')).hexdigest()
+    return 'search_results_%s_%s' % (get_search_generation(), digest)
+
+
+class CachedSearchResults(object):
+    """
+    A sequence of live pages matching a search query, backed by the cache.
+
+    The search backend is only queried on a cache miss; the total count and the
+    ordered page IDs of the first `SEARCH_RESULT_CACHE_SIZE` results are then
+    stored in the cache. Slices within the cached IDs fetch their pages in one
+    query, and slices past them are fetched from the backend, so this can be
+    handed to a `Paginator`.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self._page_ids = None
+        self._count = None
+
+    def get_backend_results(self):
+        return Page.objects.live().search(self.query)
+
+    def _load(self):
+        cache_key = get_result_cache_key(self.query)
+        cached = cache.get(cache_key)
+        if cached is None:
+            limit = getattr(settings, 'SEARCH_RESULT_CACHE_SIZE', 200)
+            results = self.get_backend_results()
+            page_ids = [page.pk for page in results[:limit]]
+            cached = {
+                'ids': page_ids,
+                # A short first window holds every result, so the backend need not count them
+                'count': len(page_ids) if len(page_ids) < limit else results.count(),
+            }
+            cache.set(cache_key, cached, getattr(settings, 'SEARCH_RESULT_CACHE_TIMEOUT', 600))
+        self._page_ids = cached['ids']
+        self._count = cached['count']
+
+    @property
+    def page_ids(self):
+        """
+        IDs of the cached first results; there may be more, see `count()`.
+        """
+        if self._page_ids is None:
+            self._load()
+        return self._page_ids
+
+    def count(self):
+        if self._count is None:
+            self._load()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            index = key + len(self) if key < 0 else key
+            if not 0 <= index < len(self):
+                raise IndexError('search result index out of range')
+            return self[index:index + 1][0]
+        if key.step not in (None, 1):
+            raise ValueError('Slicing search results with a step is not supported')
+        start, stop, _ = key.indices(len(self))
+        if start >= stop:
+            return []
+        if stop <= len(self.page_ids):
+            ids = self.page_ids[start:stop]
+        else:
+            ids = [page.pk for page in self.get_backend_results()[start:stop]]
+        pages = {page.pk: page for page in Page.objects.filter(pk__in=ids).specific()}
+        return [pages[pk] for pk in ids if pk in pages]
@@ -3,3 +3,5 @@ from wagtail.search import index
 tag_search_field = index.RelatedFields('tags', [
     index.SearchField('name'),
 ])
+
+body_search_field = index.SearchField('body_search_text')
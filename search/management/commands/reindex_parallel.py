@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from wagtail.search.backends import get_search_backend
+from wagtail.search.index import get_indexed_models
+
+from search.text import prefetch_search_text
+
+
+def get_pk_ranges(model, chunk_size):
+    """
+    Split the indexed objects of a model into primary key ranges of `chunk_size` keys.
+    """
+    bounds = model.get_indexed_objects().aggregate(min_pk=Min('pk'), max_pk=Max('pk'))
+    if bounds['min_pk'] is None:
+        return []
+    return [
+        (start, start + chunk_size)
+        for start in range(bounds['min_pk'], bounds['max_pk'] + 1, chunk_size)
+    ]
+
+
+def get_version(es):
+    """
+    Get the major and minor version of an Elasticsearch cluster, e.g. (2, 4).
+    """
+    return tuple(int(part) for part in es.info()['version']['number'].split('.')[:2])
+
+
+def index_chunk(backend_name, index_name, model_label, start, end):
+    """
+    Index the objects of a model with a primary key in [start, end) into the given index.
+
+    Runs in a worker process. `get_indexed_objects` prefetches the related
+    objects (such as tags) declared in the model's search fields, and the
+    stored StreamField texts of the chunk are loaded at once.
+    """
+    model = apps.get_model(model_label)
+    backend = get_search_backend(backend_name)
+    index = backend.index_class(backend, index_name)
+    objects = list(model.get_indexed_objects().filter(pk__gte=start, pk__lt=end))
+    prefetch_search_text(objects)
+    if objects:
+        index.add_items(model, objects)
+    return len(objects)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds an Elasticsearch index in parallel and switches the index alias to it when done'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default='default', help='Search backend name')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                            help='Number of worker processes (default: number of CPUs)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Primary keys per bulk request')
+
+    def handle(self, *args, **options):
+        backend_name = options['backend']
+        backend = get_search_backend(backend_name)
+        if not hasattr(backend, 'es'):
+            raise CommandError('Backend {} is not an Elasticsearch backend.'.format(backend_name))
+
+        alias_name = backend.index_name
+        index_name = '{}_{}'.format(alias_name, timezone.now().strftime('%Y%m%d%H%M%S'))
+        index = backend.index_class(backend, index_name)
+        index.put()
+
+        tasks = []
+        for model in get_indexed_models():
+            index.add_model(model)
+            for start, end in get_pk_ranges(model, options['chunk_size']):
+                tasks.append((backend_name, index_name, model._meta.label, start, end))
+        self.stdout.write('Indexing {} chunks into {} with {} processes'.format(
+            len(tasks), index_name, options['processes']))
+
+        # The worker processes must not share the database connections of this one
+        connections.close_all()
+        indexed = 0
+        with ProcessPoolExecutor(max_workers=options['processes']) as executor:
+            futures = [executor.submit(index_chunk, *task) for task in tasks]
+            for future in as_completed(futures):
+                indexed += future.result()
+        index.refresh()
+
+        self.switch_alias(backend.es, alias_name, index_name)
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed {} objects. {} now points to {}.'.format(indexed, alias_name, index_name)))
+
+    def switch_alias(self, es, alias_name, index_name):
+        if es.indices.exists_alias(name=alias_name):
+            old_indices = list(es.indices.get_alias(name=alias_name).keys())
+            actions = [{'remove': {'index': old_index, 'alias': alias_name}} for old_index in old_indices]
+            actions.append({'add': {'index': index_name, 'alias': alias_name}})
+            # All actions are applied atomically
+            es.indices.update_aliases(body={'actions': actions})
+            for old_index in old_indices:
+                es.indices.delete(old_index)
+        elif es.indices.exists(alias_name):
+            # An index created by update_index, to be replaced with the alias
+            if get_version(es) >= (6, 4):
+                es.indices.update_aliases(body={'actions': [
+                    {'remove_index': {'index': alias_name}},
+                    {'add': {'index': index_name, 'alias': alias_name}},
+                ]})
+            else:
+                # Older versions cannot remove an index in an alias update, so
+                # searches fail for the moment between the two requests
+                self.stdout.write(self.style.WARNING(
+                    'Deleting the index {} to replace it with an alias'.format(alias_name)))
+                es.indices.delete(alias_name)
+                es.indices.put_alias(index=index_name, name=alias_name)
+        else:
+            es.indices.put_alias(index=index_name, name=alias_name)
@@ -0,0 +1,20 @@
+from search.text import get_search_text
+
+
+class SearchTextMixin(object):
+    """
+    Index the plain text of the page's StreamFields instead of rendering them at every reindex.
+
+    Use `search.fields.body_search_field` in `search_fields` instead of `index.SearchField('body')`.
+    """
+    search_text_fields = ['body']
+
+    def body_search_text(self):
+        return get_search_text(self, 'body')
+
+    def store_search_text(self):
+        """
+        Make sure the search text of the live revision has been extracted and stored.
+        """
+        for field_name in self.search_text_fields:
+            get_search_text(self, field_name)
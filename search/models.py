@@ -0,0 +1,36 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class IndexQueueEntry(models.Model):
+    """
+    An object whose search index documents are waiting to be updated.
+
+    There is at most one entry per object, so repeated saves of the same
+    object before the queue is flushed result in a single index update.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    queued_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = (('content_type', 'object_id'),)
+
+    def __str__(self):
+        return '{}.{}'.format(self.content_type, self.object_id)
+
+
+class PageSearchText(models.Model):
+    """
+    The plain text of a StreamField of a page revision, for indexing and excerpts.
+    """
+    revision = models.ForeignKey('wagtailcore.PageRevision', on_delete=models.CASCADE, related_name='+')
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    field_name = models.CharField(max_length=50)
+    text = models.TextField()
+
+    class Meta:
+        unique_together = (('revision', 'field_name'),)
+
+    def __str__(self):
+        return '{} ({})'.format(self.revision, self.field_name)
@@ -0,0 +1,119 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from wagtail.search.backends import get_search_backend
+
+from search.models import IndexQueueEntry
+from search.text import prefetch_search_text
+
+log = logging.getLogger(__name__)
+
+FLUSH_SCHEDULED_CACHE_KEY = 'search_index_flush_scheduled'
+
+
+def get_queued_backend_names():
+    """
+    Return the names of the search backends configured with `QUEUE_UPDATES`.
+
+    These backends should also have `AUTO_UPDATE` set to False, so that
+    Wagtail does not update them synchronously as well.
+    """
+    backends = getattr(settings, 'WAGTAILSEARCH_BACKENDS', {})
+    return [name for name, params in backends.items() if params.get('QUEUE_UPDATES')]
+
+
+def enqueue_object(instance):
+    """
+    Queue a search index update for the given model instance.
+
+    The queue is flushed by a Celery task scheduled after the current transaction commits.
+    """
+    model = getattr(instance, 'specific_class', None) or type(instance)
+    content_type = ContentType.objects.get_for_model(model)
+    try:
+        with transaction.atomic():
+            IndexQueueEntry.objects.update_or_create(content_type=content_type, object_id=instance.pk)
+    except IntegrityError:
+        # Someone else queued the same object concurrently
+        pass
+    transaction.on_commit(schedule_flush)
+
+
+def schedule_flush():
+    from search.tasks import flush_index_queue
+
+    delay = getattr(settings, 'SEARCH_INDEX_FLUSH_DELAY', 10)
+    if cache.add(FLUSH_SCHEDULED_CACHE_KEY, True, delay):
+        flush_index_queue.apply_async(countdown=delay)
+
+
+def _claim_entries(batch_size):
+    with transaction.atomic():
+        entries = list(
+            IndexQueueEntry.objects.select_for_update(skip_locked=True)
+            .select_related('content_type').order_by('queued_at')[:batch_size]
+        )
+        IndexQueueEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+    return entries
+
+
+def _requeue_entries(entries):
+    # Objects queued again meanwhile already have their entries
+    IndexQueueEntry.objects.bulk_create([
+        IndexQueueEntry(content_type_id=entry.content_type_id, object_id=entry.object_id)
+        for entry in entries
+    ], ignore_conflicts=True)
+
+
+def _update_backends(backends, entries):
+    ids_by_model = defaultdict(set)
+    for entry in entries:
+        model = entry.content_type.model_class()
+        if model is not None:
+            ids_by_model[model].add(entry.object_id)
+
+    for model, ids in ids_by_model.items():
+        objects = list(model.get_indexed_objects().filter(pk__in=ids))
+        prefetch_search_text(objects)
+        deleted_ids = ids - set(obj.pk for obj in objects)
+        for backend in backends:
+            if objects:
+                backend.add_bulk(model, objects)
+            for pk in deleted_ids:
+                backend.delete(model(pk=pk))
+
+
+def flush_queue(batch_size=None):
+    """
+    Update the queued objects in the search backends, one bulk request per model and batch.
+
+    If updating a batch fails, its entries are queued again and the error is raised.
+
+    :param batch_size: Maximum number of queue entries to handle at a time
+    :type batch_size: int
+    :return: Number of queue entries handled
+    :rtype: int
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'SEARCH_INDEX_BATCH_SIZE', 200)
+    cache.delete(FLUSH_SCHEDULED_CACHE_KEY)
+    backends = [get_search_backend(name) for name in get_queued_backend_names()]
+    handled = 0
+
+    while True:
+        entries = _claim_entries(batch_size)
+        if not entries:
+            break
+        try:
+            _update_backends(backends, entries)
+        except Exception:
+            _requeue_entries(entries)
+            raise
+        handled += len(entries)
+        log.info('flushed %d queued search index updates', len(entries))
+
+    return handled
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.core.signals import page_published, page_unpublished
+from wagtail.search.index import get_indexed_models
+
+from search.cache import bump_search_generation
+from search.mixins import SearchTextMixin
+from search.queue import enqueue_object, get_queued_backend_names
+
+
+@receiver([page_published, page_unpublished], dispatch_uid='search_bump_generation')
+def bump_generation_on_publish(sender, instance, **kwargs):
+    bump_search_generation()
+
+
+@receiver(page_published, dispatch_uid='search_store_search_text')
+def store_search_text_on_publish(sender, instance, **kwargs):
+    if isinstance(instance, SearchTextMixin):
+        instance.store_search_text()
+
+
+def queue_index_update(sender, instance, **kwargs):
+    enqueue_object(instance)
+
+
+def register_queue_signal_handlers():
+    if not get_queued_backend_names():
+        return
+    for model in get_indexed_models():
+        post_save.connect(queue_index_update, sender=model)
+        post_delete.connect(queue_index_update, sender=model)
@@ -0,0 +1,215 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.timezone import utc
+from taggit.models import Tag
+from wagtail.core.models import Page
+from wagtail.search.models import Query
+
+from search.cache import get_search_generation, normalize_query
+
+logger = logging.getLogger(__name__)
+
+PAGE_TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+# Lookups of prefixes up to this length match many suggestions, so their results are
+# kept until the index changes
+TOP_CACHE_PREFIX_LENGTH = 2
+
+
+class SuggestionIndex(object):
+    """
+    An in-memory prefix index of search suggestions.
+
+    Suggestions are live page titles, tag names and popular search queries.
+    Every word of a suggestion is indexed, so "helsinki" matches "Digitaalinen Helsinki".
+
+    Each process keeps its own index. It is rebuilt from scratch every
+    `SEARCH_SUGGEST_REBUILD_INTERVAL` seconds; in between, page titles are refreshed
+    incrementally whenever the search generation is bumped by a publish. Both happen
+    in a background thread, while lookups are served from the current index.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()  # held while a build or refresh runs
+        self._keys = []  # sorted list of (key, term) tuples
+        self._terms = {}  # term -> [display text, weight, reference count]
+        self._page_terms = {}  # page id -> term
+        self._top = {}  # (prefix, limit) -> suggestions, for short prefixes
+        self.built_at = None
+        self.refreshed_at = None
+        self.checked_at = None
+        self.generation = None
+        self._building = False
+
+    def _add_term(self, text, weight):
+        term = normalize_query(text)
+        if not term:
+            return None
+        entry = self._terms.get(term)
+        if entry:
+            if weight > entry[1]:
+                entry[1] = weight
+                self._top = {}
+            entry[2] += 1
+            return term
+        self._terms[term] = [text.strip(), weight, 1]
+        self._top = {}
+        words = term.split(' ')
+        for i in range(len(words)):
+            key = (' '.join(words[i:]), term)
+            if self._building:
+                self._keys.append(key)
+            else:
+                insort(self._keys, key)
+        return term
+
+    def _remove_term(self, term):
+        entry = self._terms.get(term)
+        if not entry:
+            return
+        entry[2] -= 1
+        if entry[2] > 0:
+            return
+        del self._terms[term]
+        self._top = {}
+        words = term.split(' ')
+        for i in range(len(words)):
+            key = (' '.join(words[i:]), term)
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+
+    def _set_page_title(self, page_id, title):
+        old_term = self._page_terms.pop(page_id, None)
+        if old_term:
+            self._remove_term(old_term)
+        if title is not None:
+            term = self._add_term(title, PAGE_TITLE_WEIGHT)
+            if term:
+                self._page_terms[page_id] = term
+
+    def build(self):
+        """
+        Build a new index from scratch and swap it in.
+        """
+        generation = get_search_generation()
+        now = time.time()
+        fresh = SuggestionIndex()
+        fresh._building = True
+        try:
+            for page_id, title in Page.objects.live().filter(depth__gt=1).values_list('pk', 'title'):
+                fresh._set_page_title(page_id, title)
+            for name in Tag.objects.values_list('name', flat=True):
+                fresh._add_term(name, TAG_WEIGHT)
+            query_count = getattr(settings, 'SEARCH_SUGGEST_POPULAR_QUERIES', 200)
+            for query in Query.get_most_popular()[:query_count]:
+                fresh._add_term(query.query_string, query._hits)
+        finally:
+            fresh._keys.sort()
+            fresh._building = False
+        with self._lock:
+            self._keys = fresh._keys
+            self._terms = fresh._terms
+            self._page_terms = fresh._page_terms
+            self._top = {}
+            self.built_at = self.refreshed_at = self.checked_at = now
+            self.generation = generation
+
+    def refresh(self):
+        """
+        Bring page titles up to date with pages published or unpublished since the last refresh.
+        """
+        generation = get_search_generation()
+        now = time.time()
+        with self._lock:
+            known_ids = set(self._page_terms)
+            refreshed_at = self.refreshed_at
+        live_ids = set(Page.objects.live().filter(depth__gt=1).values_list('pk', flat=True))
+        # Allow for some clock skew between the processes
+        since = datetime.fromtimestamp(refreshed_at - 60, tz=utc)
+        changed = Page.objects.live().filter(Q(pk__in=live_ids - known_ids) | Q(last_published_at__gte=since))
+        titles = list(changed.values_list('pk', 'title'))
+        with self._lock:
+            for page_id in set(self._page_terms) - live_ids:
+                self._set_page_title(page_id, None)
+            for page_id, title in titles:
+                self._set_page_title(page_id, title)
+            self.refreshed_at = self.checked_at = now
+            self.generation = generation
+
+    def ensure_fresh(self):
+        """
+        Start a rebuild or refresh in the background if the index is out of date.
+
+        Only the very first build, when there is no index to serve yet, runs in the calling thread.
+        """
+        if self.built_at is None:
+            with self._update_lock:
+                if self.built_at is None:
+                    self.build()
+            return
+        now = time.time()
+        rebuild_interval = getattr(settings, 'SEARCH_SUGGEST_REBUILD_INTERVAL', 3600)
+        if now - self.built_at > rebuild_interval:
+            self._update_in_background(self.build)
+        elif now - self.checked_at > 1:
+            self.checked_at = now
+            if get_search_generation() != self.generation:
+                self._update_in_background(self.refresh)
+
+    def _update_in_background(self, update):
+        if not self._update_lock.acquire(blocking=False):
+            return  # Another thread is already updating the index
+        try:
+            threading.Thread(target=self._run_update, args=(update,), daemon=True).start()
+        except Exception:
+            self._update_lock.release()
+            raise
+
+    def _run_update(self, update):
+        try:
+            update()
+        except Exception:
+            # The old index is served until the next attempt
+            logger.exception('Updating the search suggestion index failed')
+        finally:
+            self._update_lock.release()
+            connection.close()
+
+    def lookup(self, prefix, limit=10):
+        """
+        Return the suggestions that have a word starting with `prefix`, best first.
+
+        :param prefix: Text typed by the user so far
+        :type prefix: str
+        :param limit: Maximum number of suggestions to return
+        :type limit: int
+        :return: Suggestions
+        :rtype: list[str]
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            suggestions = self._top.get((prefix, limit))
+            if suggestions is None:
+                start = bisect_left(self._keys, (prefix,))
+                end = bisect_left(self._keys, (prefix + '\U0010ffff',), start)
+                matches = {term for key, term in self._keys[start:end]}
+                ranked = heapq.nsmallest(limit, matches, key=lambda term: (-self._terms[term][1], len(term), term))
+                suggestions = [self._terms[term][0] for term in ranked]
+                if len(prefix) <= TOP_CACHE_PREFIX_LENGTH:
+                    self._top[(prefix, limit)] = suggestions
+            return list(suggestions)
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .queue import flush_queue
+
+
+# The queue entries of a failed batch are kept, so a retry picks them up again
+@shared_task(ignore_result=True, autoretry_for=(Exception,), max_retries=5, retry_backoff=True, retry_backoff_max=600)
+def flush_index_queue():
+    flush_queue()
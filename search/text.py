@@ -0,0 +1,209 @@
+import logging
+
+from django.db import IntegrityError
+from django.db.models import Max
+from lxml import etree, html as lxml_html
+from wagtail.contrib.table_block.blocks import TableBlock
+from wagtail.core import blocks
+
+log = logging.getLogger(__name__)
+
+
+def html_to_text(value):
+    """
+    Strip the tags from an HTML fragment and collapse its whitespace.
+
+    :param value: HTML fragment
+    :type value: str
+    :return: Plain text
+    :rtype: str
+    """
+    if not value or not value.strip():
+        return ''
+    try:
+        fragment = lxml_html.fragment_fromstring(value, create_parent='div')
+    except (etree.ParserError, ValueError):
+        return ' '.join(value.split())
+    return ' '.join(' '.join(fragment.itertext()).split())
+
+
+def _iter_stream_text(block, value):
+    for child in value:
+        yield from iter_block_text(child.block, child.value)
+
+
+def _iter_struct_text(block, value):
+    for name, child_block in block.child_blocks.items():
+        yield from iter_block_text(child_block, value.get(name))
+
+
+def _iter_list_text(block, value):
+    for item in value:
+        yield from iter_block_text(block.child_block, item)
+
+
+def _iter_rich_text(block, value):
+    yield html_to_text(value.source)
+
+
+def _iter_raw_html_text(block, value):
+    yield html_to_text(str(value))
+
+
+def _iter_table_text(block, value):
+    for row in value.get('data') or []:
+        for cell in row:
+            if cell:
+                yield ' '.join(str(cell).split())
+
+
+def _iter_searchable_content(block, value):
+    for content in block.get_searchable_content(value):
+        yield html_to_text(content)
+
+
+# Text extractors by block class; blocks of other classes give their searchable content
+BLOCK_TEXT_EXTRACTORS = {
+    blocks.StreamBlock: _iter_stream_text,
+    blocks.StructBlock: _iter_struct_text,
+    blocks.ListBlock: _iter_list_text,
+    blocks.RichTextBlock: _iter_rich_text,
+    blocks.RawHTMLBlock: _iter_raw_html_text,
+    TableBlock: _iter_table_text,
+}
+
+
+def iter_block_text(block, value):
+    if value is None:
+        return
+    # Subclasses of the blocks are handled like the blocks themselves
+    extractor = next(
+        (BLOCK_TEXT_EXTRACTORS[cls] for cls in type(block).__mro__ if cls in BLOCK_TEXT_EXTRACTORS),
+        _iter_searchable_content,
+    )
+    yield from extractor(block, value)
+
+
+def extract_stream_text(stream_value):
+    """
+    Extract the plain text content of a StreamField value.
+
+    :param stream_value: StreamField value
+    :type stream_value: wagtail.core.blocks.StreamValue
+    :return: Plain text, one line per block
+    :rtype: str
+    """
+    if not stream_value:
+        return ''
+    return '\n'.join(text for text in iter_block_text(stream_value.stream_block, stream_value) if text)
+
+
+def _store_search_text(page, revision_id, field_name, text):
+    from search.models import PageSearchText
+
+    try:
+        PageSearchText.objects.get_or_create(
+            revision_id=revision_id, field_name=field_name, defaults={'page_id': page.pk, 'text': text}
+        )
+    except IntegrityError:
+        # Stored concurrently by another process
+        pass
+
+
+def prefetch_search_text(pages):
+    """
+    Load the stored search texts of many pages at once, e.g. for a chunk of pages being indexed.
+
+    `get_search_text` then only queries the database for the pages whose text
+    has not been extracted yet. Pages without search text fields are skipped.
+
+    :param pages: Page objects
+    :type pages: list[wagtail.core.models.Page]
+    """
+    from wagtail.core.models import PageRevision
+    from search.models import PageSearchText
+
+    pages = [
+        page for page in pages
+        if page.pk and hasattr(page, 'search_text_fields') and not hasattr(page, '_prefetched_search_text')
+    ]
+    if not pages:
+        return
+    page_ids = [page.pk for page in pages]
+    field_names = {field_name for page in pages for field_name in page.search_text_fields}
+    # Revisions are created in id order, so the one with the greatest id is the latest
+    latest_revision_ids = dict(
+        PageRevision.objects.filter(page_id__in=page_ids).order_by().values('page_id')
+        .annotate(latest_id=Max('id')).values_list('page_id', 'latest_id')
+    )
+    latest_text_ids = (
+        PageSearchText.objects.filter(page_id__in=page_ids, field_name__in=field_names).order_by()
+        .values('page_id', 'field_name').annotate(latest_id=Max('id')).values_list('latest_id', flat=True)
+    )
+    texts = {
+        (stored.page_id, stored.field_name): stored
+        for stored in PageSearchText.objects.filter(pk__in=list(latest_text_ids))
+    }
+    for page in pages:
+        page._prefetched_search_text = {
+            'revision_id': latest_revision_ids.get(page.pk),
+            'texts': {
+                field_name: texts[(page.pk, field_name)]
+                for field_name in page.search_text_fields if (page.pk, field_name) in texts
+            },
+        }
+
+
+def _get_prefetched_search_text(page, field_name, prefetched):
+    stored = prefetched['texts'].get(field_name)
+    if page.has_unpublished_changes:
+        # The latest revision is a draft; the text stored at the last publish is the live one.
+        return stored.text if stored else extract_stream_text(getattr(page, field_name))
+    revision_id = prefetched['revision_id']
+    if stored and stored.revision_id == revision_id:
+        return stored.text
+    text = extract_stream_text(getattr(page, field_name))
+    if revision_id is not None:
+        _store_search_text(page, revision_id, field_name, text)
+    return text
+
+
+def get_search_text(page, field_name):
+    """
+    Get the plain text of a StreamField of a page, as extracted from its live revision.
+
+    The text is extracted once per revision and stored in the database,
+    so indexing and excerpts do not need to walk the blocks again.
+    Use `prefetch_search_text` before getting the texts of many pages.
+
+    :param page: Page object
+    :type page: wagtail.core.models.Page
+    :param field_name: Name of the StreamField
+    :type field_name: str
+    :return: Plain text
+    :rtype: str
+    """
+    from search.models import PageSearchText
+
+    if not page.pk:
+        return extract_stream_text(getattr(page, field_name))
+    prefetched = getattr(page, '_prefetched_search_text', None)
+    if prefetched is not None:
+        return _get_prefetched_search_text(page, field_name, prefetched)
+    stored = PageSearchText.objects.filter(page_id=page.pk, field_name=field_name)
+
+    if page.has_unpublished_changes:
+        # The latest revision is a draft; the text stored at the last publish is the live one.
+        text = stored.order_by('-id').values_list('text', flat=True).first()
+        if text is None:
+            text = extract_stream_text(getattr(page, field_name))
+        return text
+
+    revision = page.get_latest_revision()
+    if revision is None:
+        return extract_stream_text(getattr(page, field_name))
+    text = stored.filter(revision=revision).values_list('text', flat=True).first()
+    if text is None:
+        text = extract_stream_text(getattr(page, field_name))
+        _store_search_text(page, revision.pk, field_name, text)
+    return text
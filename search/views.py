@@ -1,8 +1,12 @@
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import JsonResponse
 from django.shortcuts import render
 from wagtail.core.models import Page
 from wagtail.search.models import Query
 
+from search.cache import CachedSearchResults
+from search.suggest import suggestion_index
+
 
 def search(request):
     search_query = request.GET.get('query', None)
@@ -10,7 +14,7 @@ def search(request):
 
     # Search
     if search_query:
-        search_results = Page.objects.live().search(search_query)
+        search_results = CachedSearchResults(search_query)
         query = Query.get(search_query)
 
         # Record hit
@@ -31,3 +35,12 @@ def search(request):
         'search_query': search_query,
         'search_results': search_results,
     })
+
+
+def suggest(request):
+    prefix = request.GET.get('q', '')
+    suggestion_index.ensure_fresh()
+    return JsonResponse({
+        'query': prefix,
+        'suggestions': suggestion_index.lookup(prefix),
+    })